@@ -0,0 +1,478 @@
+"""
+-----------------------------------------------------------------------------
+@project 	:		Interpreter IPP 2022
+@file 		:		benchmark.py
+@email		:		xdzuri00@stud.fit.vutbr.cz
+@author 	:		Adam Dzurilla, xdzuri00
+-----------------------------------------------------------------------------
+"""
+
+import sys
+import io
+import os
+import glob
+import json
+import time
+import inspect
+import contextlib
+import tracemalloc
+from xml.sax.saxutils import escape
+
+import interpret
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+DEFAULT_SCALE = 10000  # Parameter of the synthetic kernels, e.g. the number of the iterations
+DEFAULT_REPEAT = 3  # Number of the measurements of every program, the fastest one is reported
+
+# Programs of the test corpus measured by the suite, the programs which can't be interpreted are reported with the error
+DEFAULT_CORPUS = [
+    'ipp-2022-tests/interpret-only/**/*.src',
+    'tests/int-only/**/*.src',
+    'ipp-2022-tests/koule/*/*.xml',
+]
+
+
+def print_help_message():
+    """
+    The function prints help message
+    """
+    print("Usage:")
+    print("\tpython3.8 benchmark.py [OPTIONS]")
+    print()
+    print("Options:")
+    print("\t--help\t\t\tDisplay this message")
+    print("\t--sizes=N,N,...\t\tNumbers of the instructions of the loaded programs")
+    print("\t--memory\t\tMeasure the memory of the loaded programs instead of the time")
+    print("\t--suite\t\t\tMeasure the loading and the interpretation of the corpus programs and the kernels")
+    print("\t--scale=N\t\tParameter of the kernels of the suite (default 10000)")
+    print("\t--repeat=N\t\tNumber of the measurements of every program of the suite (default 3)")
+    print("\t--corpus=PATTERN\tPattern of the corpus programs of the suite, can be repeated")
+    print("\t--optimize\t\tOptimize the programs of the suite as interpret.py --optimize")
+    print("\t--json\t\t\tPrint the results of the suite as JSON")
+    print()
+    print("The program measures the loading of the generated programs by interpret.py")
+    print("With --suite the program measures the loading and the interpretation of the programs separately")
+
+    exit(interpret.NO_ERROR)
+
+
+def generate_program(number_of_instructions: int) -> bytes:
+    """
+    Generates XML of the program with the number of instructions
+    The orders are generated in descending order, so the instructions have to be sorted
+    @param number_of_instructions: Number of the instructions of the program
+    @return: XML of the program
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+
+    for index in range(number_of_instructions):
+        order = number_of_instructions - index
+
+        # Every tenth instruction is label and the following one jumps on it
+        if index % 10 == 0:
+            lines.append('<instruction order="%d" opcode="LABEL">'
+                         '<arg1 type="label">label%d</arg1></instruction>' % (order, index))
+        elif index % 10 == 1:
+            lines.append('<instruction order="%d" opcode="JUMPIFEQ">'
+                         '<arg1 type="label">label%d</arg1><arg2 type="var">GF@var%d</arg2>'
+                         '<arg3 type="int">0</arg3></instruction>' % (order, index - 1, index))
+        else:
+            lines.append('<instruction order="%d" opcode="ADD">'
+                         '<arg1 type="var">GF@var%d</arg1><arg2 type="var">GF@var%d</arg2>'
+                         '<arg3 type="int">1</arg3></instruction>' % (order, index, index))
+
+    lines.append('</program>')
+
+    return '\n'.join(lines).encode()
+
+
+def load_program(source: bytes) -> interpret.Program:
+    """
+    Loads the program the same way as interpret.py does
+    @param source: XML of the program
+    @return: Loaded program
+    """
+    program = interpret.Program(interpret.InputReader(io.BytesIO()), interpret.Output(io.BytesIO()))
+    interpret.load_xml(io.BytesIO(source), program)
+
+    return program
+
+
+def ippcode_to_xml(source: str) -> bytes:
+    """
+    Translates IPPcode22 source of the kernel to XML of the program,
+    the kinds of the arguments are taken from interpret.py
+    @param source: IPPcode22 source without comments, one instruction on every line
+    @return: XML of the program
+    """
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<program language="IPPcode22">']
+
+    instructions = [line.split() for line in source.splitlines() if line.strip()]
+    for order, (opcode, *arguments) in enumerate(instructions[1:], 1):
+        lines.append('<instruction order="%d" opcode="%s">' % (order, opcode))
+
+        kinds = interpret.Program.operands_kinds[opcode]
+        for number, (argument, kind) in enumerate(zip(arguments, kinds), 1):
+            if kind == 'label' or kind == 'type':
+                arg_type, value = kind, argument
+            elif argument[0:3] in ('GF@', 'LF@', 'TF@'):
+                arg_type, value = 'var', argument
+            else:
+                arg_type, value = argument.split('@', 1)
+
+            lines.append('<arg%d type="%s">%s</arg%d>' % (number, arg_type, escape(value), number))
+
+        lines.append('</instruction>')
+
+    lines.append('</program>')
+
+    return '\n'.join(lines).encode()
+
+
+def kernel_counted_loop(scale: int) -> str:
+    """
+    @param scale: Number of the iterations
+    @return: IPPcode22 of the counted loop
+    """
+    return '''.IPPcode22
+        DEFVAR GF@i
+        MOVE GF@i int@0
+        LABEL loop
+        ADD GF@i GF@i int@1
+        JUMPIFNEQ loop GF@i int@%d
+        WRITE GF@i
+    ''' % scale
+
+
+def kernel_recursion(scale: int) -> str:
+    """
+    @param scale: Depth of the recursion
+    @return: IPPcode22 of the recursive sum of the numbers with the local frames
+    """
+    return '''.IPPcode22
+        DEFVAR GF@result
+        CREATEFRAME
+        DEFVAR TF@n
+        MOVE TF@n int@%d
+        CALL sum
+        WRITE GF@result
+        EXIT int@0
+        LABEL sum
+        PUSHFRAME
+        JUMPIFNEQ recursion LF@n int@0
+        MOVE GF@result int@0
+        POPFRAME
+        RETURN
+        LABEL recursion
+        CREATEFRAME
+        DEFVAR TF@n
+        SUB TF@n LF@n int@1
+        CALL sum
+        ADD GF@result GF@result LF@n
+        POPFRAME
+        RETURN
+    ''' % scale
+
+
+def kernel_string_building(scale: int) -> str:
+    """
+    @param scale: Length of the built string
+    @return: IPPcode22 of the building of the string by GETCHAR and CONCAT
+    """
+    return '''.IPPcode22
+        DEFVAR GF@s
+        DEFVAR GF@i
+        DEFVAR GF@k
+        DEFVAR GF@c
+        MOVE GF@s string@
+        MOVE GF@i int@0
+        LABEL loop
+        IDIV GF@k GF@i int@26
+        MUL GF@k GF@k int@26
+        SUB GF@k GF@i GF@k
+        GETCHAR GF@c string@abcdefghijklmnopqrstuvwxyz GF@k
+        CONCAT GF@s GF@s GF@c
+        ADD GF@i GF@i int@1
+        JUMPIFNEQ loop GF@i int@%d
+        STRLEN GF@i GF@s
+        WRITE GF@i
+    ''' % scale
+
+
+def kernel_stack_arithmetic(scale: int) -> str:
+    """
+    @param scale: Number of the iterations
+    @return: IPPcode22 of the arithmetic by the STACK extension
+    """
+    return '''.IPPcode22
+        DEFVAR GF@i
+        DEFVAR GF@x
+        MOVE GF@i int@0
+        LABEL loop
+        PUSHS GF@i
+        PUSHS int@3
+        MULS
+        PUSHS int@7
+        ADDS
+        PUSHS int@2
+        IDIVS
+        POPS GF@x
+        PUSHS GF@i
+        PUSHS int@1
+        ADDS
+        POPS GF@i
+        PUSHS GF@i
+        PUSHS int@%d
+        JUMPIFNEQS loop
+        WRITE GF@x
+    ''' % scale
+
+
+# Synthetic kernels of the suite by their names
+KERNELS = {
+    'counted_loop': kernel_counted_loop,
+    'recursion': kernel_recursion,
+    'string_building': kernel_string_building,
+    'stack_arithmetic': kernel_stack_arithmetic,
+}
+
+
+def measure_program(source: bytes, input_data: bytes, optimize: bool) -> dict:
+    """
+    Loads and interprets the program once, the output and the stderr are discarded
+    @param source: XML of the program
+    @param input_data: Input of the READ instruction
+    @param optimize: Optimizes the program as interpret.py --optimize
+    @return: Times of the loading and the interpretation, numbers of the instructions, the return code and the error
+    """
+    program = interpret.Program(
+        interpret.InputReader(io.BytesIO(input_data)), interpret.Output(io.BytesIO()), io.StringIO()
+    )
+    result = {'instructions': 0, 'executed': 0, 'load_seconds': 0.0, 'run_seconds': 0.0, 'code': 0, 'error': False}
+
+    with contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        try:
+            interpret.load_xml(io.BytesIO(source), program)
+            if optimize:
+                program.propagate_constants()
+                program.specialize_instructions()
+                program.fuse_instructions(False)
+        except interpret.InterpretError as error:
+            result['code'] = error.code
+            result['error'] = True
+            return result
+        result['load_seconds'] = time.perf_counter() - start
+        result['instructions'] = len(program.instructions)
+
+        start = time.perf_counter()
+        try:
+            program.run()
+            result['executed'] = program.get_number_of_proceeded_functions()
+        except interpret.ProgramExit as program_exit:
+            result['code'] = program_exit.code
+            # The instruction which exits is proceeded too
+            result['executed'] = program.get_number_of_proceeded_functions() + 1
+        except interpret.InterpretError as error:
+            result['code'] = error.code
+            result['error'] = True
+            result['executed'] = program.get_number_of_proceeded_functions() + 1
+        result['run_seconds'] = time.perf_counter() - start
+
+    return result
+
+
+def measure_repeatedly(name: str, kind: str, source: bytes, input_data: bytes, repeat: int, optimize: bool) -> dict:
+    """
+    Measures the program repeatedly and keeps the fastest loading and interpretation
+    @param name: Name of the program in the results
+    @param kind: Kind of the program, 'kernel' or 'corpus'
+    @param source: XML of the program
+    @param input_data: Input of the READ instruction
+    @param repeat: Number of the measurements
+    @param optimize: Optimizes the program as interpret.py --optimize
+    @return: The result of the program
+    """
+    results = [measure_program(source, input_data, optimize) for _ in range(repeat)]
+
+    result = results[0]
+    result['name'] = name
+    result['kind'] = kind
+    result['load_seconds'] = min(measured['load_seconds'] for measured in results)
+    result['run_seconds'] = min(measured['run_seconds'] for measured in results)
+    result['instructions_per_second'] = result['executed'] / result['run_seconds'] if result['run_seconds'] else 0.0
+
+    return result
+
+
+def benchmark_suite(patterns: list, scale: int, repeat: int, optimize: bool, as_json: bool):
+    """
+    Measures the loading and the interpretation of the synthetic kernels and the corpus programs separately
+    The programs which end by the error are reported with the error and not summed,
+    the corpus programs whose expected return code is not zero are skipped
+    @param patterns: Patterns of the corpus programs
+    @param scale: Parameter of the kernels
+    @param repeat: Number of the measurements of every program
+    @param optimize: Optimizes the programs as interpret.py --optimize
+    @param as_json: Prints the results as JSON instead of the table
+    """
+    results = []
+
+    for name, kernel in KERNELS.items():
+        source = ippcode_to_xml(kernel(scale))
+        results.append(measure_repeatedly(name, 'kernel', source, b'', repeat, optimize))
+
+    for file_name in sorted({name for pattern in patterns for name in glob.glob(pattern, recursive=True)}):
+        # The expected return code and the input of the test have the same name as the source
+        rc_name = os.path.splitext(file_name)[0] + '.rc'
+        if os.path.exists(rc_name):
+            with open(rc_name) as f:
+                if f.read().strip() not in ('', '0'):
+                    continue
+
+        with open(file_name, 'rb') as f:
+            source = f.read()
+
+        input_name = os.path.splitext(file_name)[0] + '.in'
+        input_data = b''
+        if os.path.exists(input_name):
+            with open(input_name, 'rb') as f:
+                input_data = f.read()
+
+        results.append(measure_repeatedly(file_name, 'corpus', source, input_data, repeat, optimize))
+
+    measured = [result for result in results if not result['error']]
+    run_seconds = sum(result['run_seconds'] for result in measured)
+    summary = {
+        'python': sys.version.split()[0],
+        'scale': scale,
+        'repeat': repeat,
+        'optimize': optimize,
+        'load_seconds': sum(result['load_seconds'] for result in measured),
+        'run_seconds': run_seconds,
+        'executed': sum(result['executed'] for result in measured),
+        'errors': len(results) - len(measured),
+    }
+    summary['instructions_per_second'] = summary['executed'] / run_seconds if run_seconds else 0.0
+
+    if as_json:
+        print(json.dumps({'summary': summary, 'results': results}, indent=2))
+        return
+
+    print('%-60s %12s %12s %10s %10s %14s' % ('PROGRAM', 'INSTRUCTIONS', 'EXECUTED', 'LOAD S', 'RUN S', 'INS/S'))
+    for result in results:
+        if result['error']:
+            print('%-60s %12s' % (result['name'][-60:], 'error ' + str(result['code'])))
+        else:
+            print('%-60s %12d %12d %10.4f %10.4f %14.0f' % (
+                result['name'][-60:], result['instructions'], result['executed'],
+                result['load_seconds'], result['run_seconds'], result['instructions_per_second']
+            ))
+
+    print()
+    print('Total: %d executed instructions, load %.4f s, run %.4f s, %.0f instructions per second, %d errors' % (
+        summary['executed'], summary['load_seconds'], summary['run_seconds'],
+        summary['instructions_per_second'], summary['errors']
+    ))
+
+
+def benchmark_load(sizes: list):
+    """
+    Measures the loading of the programs and prints the time per instruction,
+    the time per instruction has to stay the same for the linear loading
+    @param sizes: Numbers of the instructions of the loaded programs
+    """
+    print('%12s %12s %18s' % ('INSTRUCTIONS', 'SECONDS', 'MICROSECONDS/INS'))
+
+    for size in sizes:
+        source = generate_program(size)
+
+        start = time.perf_counter()
+        load_program(source)
+        seconds = time.perf_counter() - start
+
+        print('%12d %12.3f %18.3f' % (size, seconds, seconds / size * 1000000))
+
+
+def benchmark_memory(sizes: list):
+    """
+    Measures the memory of the loaded programs, the memory of the source is not included
+    @param sizes: Numbers of the instructions of the loaded programs
+    """
+    print('%12s %12s %12s %14s' % ('INSTRUCTIONS', 'MIB', 'PEAK MIB', 'BYTES/INS'))
+
+    for size in sizes:
+        source = generate_program(size)
+
+        tracemalloc.start()
+        program = load_program(source)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print('%12d %12.1f %12.1f %14.1f' % (size, current / 2 ** 20, peak / 2 ** 20, current / size))
+
+        del program
+
+
+def main():
+    """
+    Main program function
+    """
+    sizes = DEFAULT_SIZES
+    memory = False
+    suite = False
+    scale = DEFAULT_SCALE
+    repeat = DEFAULT_REPEAT
+    patterns = []
+    optimize = False
+    as_json = False
+
+    # Cycle through arguments
+    for arg in sys.argv[1:]:
+        if arg == '--help':
+            print_help_message()
+        elif arg[0:8] == '--sizes=':
+            try:
+                sizes = [int(size) for size in arg[8:].split(',')]
+            except ValueError:
+                interpret.print_error_message(
+                    'Invalid sizes: ' + arg[8:],
+                    interpret.ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        elif arg == '--memory':
+            memory = True
+        elif arg == '--suite':
+            suite = True
+        elif arg[0:8] == '--scale=':
+            scale = interpret.parse_number(arg, 8)
+        elif arg[0:9] == '--repeat=':
+            repeat = interpret.parse_number(arg, 9)
+        elif arg[0:9] == '--corpus=':
+            patterns.append(arg[9:])
+        elif arg == '--optimize':
+            optimize = True
+        elif arg == '--json':
+            as_json = True
+        else:
+            interpret.print_error_message(
+                'Unknown parameter: ' + arg,
+                interpret.ERROR_INVALID_PARAMS_COMBINATION,
+                inspect.currentframe().f_lineno
+            )
+
+    if suite:
+        benchmark_suite(patterns or DEFAULT_CORPUS, scale, repeat, optimize, as_json)
+    elif memory:
+        benchmark_memory(sizes)
+    else:
+        benchmark_load(sizes)
+
+
+# The calling of the main function, the errors end the program with their codes
+if __name__ == "__main__":
+    try:
+        main()
+    except interpret.InterpretError as error:
+        error.write(sys.stderr)
+        exit(error.code)
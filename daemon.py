@@ -0,0 +1,384 @@
+"""
+-----------------------------------------------------------------------------
+@project 	:		Interpreter IPP 2022
+@file 		:		daemon.py
+@email		:		xdzuri00@stud.fit.vutbr.cz
+@author 	:		Adam Dzurilla, xdzuri00
+-----------------------------------------------------------------------------
+"""
+
+import sys
+import os
+import gc
+import json
+import base64
+import socket
+import signal
+import inspect
+import traceback
+
+import interpret
+
+DEFAULT_SOCKET = 'interpret.sock'
+DEFAULT_JOBS_PER_WORKER = 1000  # Number of the jobs after which the worker is replaced by the new one
+MAX_REQUEST_SIZE = 256 * 1024 * 1024  # Size limit of one request in bytes
+
+
+class JobTimeout(Exception):
+    """
+    The job exceeded the time limit
+    """
+
+
+def print_help_message():
+    """
+    The function prints help message
+    """
+    print("Usage:")
+    print("\tpython3.8 daemon.py [OPTIONS]")
+    print("\tpython3.8 daemon.py --submit --source=FILE [--input=FILE] [OPTIONS]")
+    print()
+    print("Options:")
+    print("\t--help\t\t\tDisplay this message")
+    print("\t--socket=PATH\t\tSet the Unix socket of the daemon (default interpret.sock)")
+    print("\t--workers=N\t\tNumber of the worker processes (default the number of the processors)")
+    print("\t--jobs-per-worker=N\tNumber of the jobs after which the worker is recycled (default 1000)")
+    print()
+    print("Client options:")
+    print("\t--submit\t\tSend the job to the running daemon and print its result")
+    print("\t--source=FILE\t\tSet source file")
+    print("\t--input=FILE\t\tSet input file (default empty input)")
+    print("\t--max-steps=N\t\tLimit of the proceeded instructions")
+    print("\t--max-output=BYTES\tLimit of the output")
+    print("\t--timeout=SECONDS\tTime limit of the job")
+    print("\t--optimize\t\tOptimize the program as interpret.py --optimize")
+    print()
+    print("The daemon keeps the worker processes with interpret.py already imported, the jobs are received")
+    print("over the Unix socket as JSON lines, see readme2.md")
+
+    exit(interpret.NO_ERROR)
+
+
+def raise_timeout(signal_number, frame):
+    """
+    Handler of the alarm signal which interrupts the job
+    """
+    raise JobTimeout()
+
+
+def encode(data: bytes) -> str:
+    """
+    @param data: Bytes of the job or the result
+    @return: The bytes as base64 text for JSON
+    """
+    return base64.b64encode(data).decode('ascii')
+
+
+def receive_line(connection) -> bytes:
+    """
+    Reads one line from the connection
+    @param connection: The socket
+    @return: The line without the end of line
+    """
+    chunks = []
+    size = 0
+
+    while True:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+
+        chunks.append(chunk)
+        size += len(chunk)
+        if chunk.endswith(b'\n'):
+            break
+        if size > MAX_REQUEST_SIZE:
+            raise ValueError('Request is too large')
+
+    return b''.join(chunks).rstrip(b'\n')
+
+
+def handle_job(request: dict) -> dict:
+    """
+    Interprets the job by interpret.run_program
+    @param request: The job, 'source' (base64 xml) or 'path' (name of the xml file), optional 'input' (base64),
+                    'max_steps', 'max_output', 'timeout' and 'optimize'
+    @return: Return code, the output and the stderr of the program as base64
+    """
+    if 'source' in request:
+        source = base64.b64decode(request['source'])
+    else:
+        source = str(request['path'])
+    input_data = base64.b64decode(request.get('input', ''))
+
+    timeout = request.get('timeout')
+
+    # The timer is armed and disarmed inside the try, so the alarm is always caught as the timeout of the job
+    try:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, float(timeout))
+
+        code, stdout, stderr = interpret.run_program(
+            source,
+            input_data,
+            request.get('max_steps'),
+            request.get('max_output'),
+            bool(request.get('optimize'))
+        )
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    except JobTimeout:
+        return timeout_response()
+    except Exception:
+        # The uncaught exception ends the interpreter with code 1
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        code, stdout, stderr = 1, b'', traceback.format_exc().encode('utf-8', 'replace')
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return {'code': code, 'stdout': encode(stdout), 'stderr': encode(stderr)}
+
+
+def timeout_response() -> dict:
+    """
+    @return: Result of the job which exceeded the time limit
+    """
+    return {'code': None, 'stdout': encode(b''), 'stderr': encode(b'Time limit of the job exceeded\n')}
+
+
+def worker_loop(listener, jobs_per_worker: int):
+    """
+    Serves the jobs of the connections accepted from the shared socket, then the worker ends
+    and the daemon starts the new one, so the memory of the interpreted programs is returned
+    @param listener: Listening Unix socket of the daemon
+    @param jobs_per_worker: Number of the served jobs
+    """
+    # The daemon stops the workers, the interrupt of the terminal is handled by the daemon only
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, raise_timeout)
+
+    for _ in range(jobs_per_worker):
+        connection, address = listener.accept()
+
+        with connection:
+            try:
+                request = json.loads(receive_line(connection))
+                response = handle_job(request)
+            except JobTimeout:
+                # The alarm which came after the job was interpreted doesn't end the worker
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                response = timeout_response()
+            except (ValueError, TypeError, KeyError, AttributeError) as error:
+                response = {'error': 'Invalid request: ' + str(error)}
+
+            try:
+                connection.sendall(json.dumps(response).encode('ascii') + b'\n')
+            except OSError:
+                # The client closed the connection, the result is not needed anymore
+                pass
+
+
+def start_worker(listener, jobs_per_worker: int) -> int:
+    """
+    Forks the worker process, the worker shares the imported interpreter with the daemon
+    @param listener: Listening Unix socket of the daemon
+    @param jobs_per_worker: Number of the jobs served by the worker
+    @return: Pid of the worker
+    """
+    pid = os.fork()
+
+    if pid == 0:
+        code = 0
+        try:
+            worker_loop(listener, jobs_per_worker)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            # The worker never returns to the code of the daemon
+            os._exit(code)
+
+    return pid
+
+
+def serve(socket_path: str, workers: int, jobs_per_worker: int):
+    """
+    Starts the workers and replaces the ended ones until the daemon is stopped by SIGTERM or SIGINT
+    @param socket_path: Path of the Unix socket
+    @param workers: Number of the worker processes
+    @param jobs_per_worker: Number of the jobs after which the worker is recycled
+    """
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(socket_path)
+        listener.listen(128)
+    except OSError:
+        interpret.print_error_message(
+            'Socket can\'t be created: ' + socket_path,
+            interpret.ERROR_OPEN_OUTPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+
+    # The objects of the imported interpreter are not checked by the garbage collector of the workers,
+    # so their pages stay shared with the daemon
+    gc.freeze()
+
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, lambda signal_number, frame: sys.exit(0))
+
+    children = set()
+    try:
+        for _ in range(workers):
+            children.add(start_worker(listener, jobs_per_worker))
+
+        sys.stderr.write('Listening on ' + socket_path + ' with ' + str(workers) + ' workers\n')
+
+        while True:
+            pid, status = os.wait()
+            if pid in children:
+                children.discard(pid)
+                children.add(start_worker(listener, jobs_per_worker))
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except OSError:
+                pass
+
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def submit(socket_path: str, source=None, path=None, input_data: bytes = b'', max_steps=None, max_output=None,
+           timeout=None, optimize: bool = False) -> tuple:
+    """
+    Sends the job to the daemon and waits for its result
+    @param socket_path: Path of the Unix socket of the daemon
+    @param source: XML of the program as bytes or None
+    @param path: Name of the xml file read by the daemon if the source is None
+    @param input_data: Input of the READ instruction
+    @param max_steps: Limit of the proceeded instructions or None
+    @param max_output: Limit of the output bytes or None
+    @param timeout: Time limit of the job in seconds or None
+    @param optimize: Optimizes the program as interpret.py --optimize
+    @return: Return code (None after the timeout), the output and the stderr of the program as bytes
+    """
+    request = {'input': encode(input_data), 'optimize': optimize}
+    if source is not None:
+        request['source'] = encode(source)
+    else:
+        request['path'] = os.path.abspath(path)
+    if max_steps is not None:
+        request['max_steps'] = max_steps
+    if max_output is not None:
+        request['max_output'] = max_output
+    if timeout is not None:
+        request['timeout'] = timeout
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode('ascii') + b'\n')
+        response = json.loads(receive_line(connection))
+
+    if 'error' in response:
+        raise ValueError(response['error'])
+
+    return response['code'], base64.b64decode(response['stdout']), base64.b64decode(response['stderr'])
+
+
+def main():
+    """
+    Main program function
+    """
+    socket_path = DEFAULT_SOCKET
+    workers = os.cpu_count() or 1
+    jobs_per_worker = DEFAULT_JOBS_PER_WORKER
+    client = False
+    source_file = None
+    input_file = None
+    limits = {}
+    optimize = False
+
+    # Cycle through arguments
+    for arg in sys.argv[1:]:
+        if arg == '--help':
+            print_help_message()
+        elif arg[0:9] == '--socket=':
+            socket_path = arg[9:]
+        elif arg[0:10] == '--workers=':
+            workers = interpret.parse_number(arg, 10)
+        elif arg[0:18] == '--jobs-per-worker=':
+            jobs_per_worker = interpret.parse_number(arg, 18)
+        elif arg == '--submit':
+            client = True
+        elif arg[0:9] == '--source=':
+            source_file = arg[9:]
+        elif arg[0:8] == '--input=':
+            input_file = arg[8:]
+        elif arg[0:12] == '--max-steps=':
+            limits['max_steps'] = interpret.parse_number(arg, 12)
+        elif arg[0:13] == '--max-output=':
+            limits['max_output'] = interpret.parse_number(arg, 13)
+        elif arg[0:10] == '--timeout=':
+            limits['timeout'] = interpret.parse_number(arg, 10)
+        elif arg == '--optimize':
+            optimize = True
+        else:
+            interpret.print_error_message(
+                'Unknown parameter: ' + arg,
+                interpret.ERROR_INVALID_PARAMS_COMBINATION,
+                inspect.currentframe().f_lineno
+            )
+
+    if not client:
+        serve(socket_path, workers, jobs_per_worker)
+        return
+
+    if source_file is None:
+        interpret.print_error_message(
+            'Missing parameter --source',
+            interpret.ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    input_data = b''
+    if input_file is not None:
+        try:
+            with open(input_file, 'rb') as f:
+                input_data = f.read()
+        except OSError:
+            interpret.print_error_message(
+                'Input file can\'t be opened: ' + input_file,
+                interpret.ERROR_OPEN_INPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+
+    try:
+        code, stdout, stderr = submit(socket_path, path=source_file, input_data=input_data, optimize=optimize, **limits)
+    except (OSError, ValueError) as error:
+        interpret.print_error_message(
+            'Daemon error: ' + str(error),
+            interpret.ERROR_INTERNAL,
+            inspect.currentframe().f_lineno
+        )
+
+    sys.stdout.buffer.write(stdout)
+    sys.stdout.flush()
+    sys.stderr.write(stderr.decode('utf-8', 'replace'))
+
+    # The job which exceeded the time limit ends like the uncaught exception
+    exit(1 if code is None else code)
+
+
+# The calling of the main function, the errors end the program with their codes
+if __name__ == "__main__":
+    try:
+        main()
+    except interpret.InterpretError as error:
+        error.write(sys.stderr)
+        exit(error.code)
@@ -8,6 +8,21 @@
 """
 
 import sys
+import os
+import collections
+import functools
+import gc
+import glob
+import hashlib
+import io
+import itertools
+import json
+import marshal
+import mmap
+import multiprocessing
+import operator
+import signal
+import time
 import xml.etree.ElementTree as ET
 from enum import Enum
 import inspect
@@ -31,49 +46,151 @@ ERROR_INTERNAL = 99
 
 # endregion
 
+
+# region Errors
+class InterpretError(Exception):
+    """
+    The error of the interpretation, the subclasses keep the exit codes of the errors,
+    so the program which embeds the interpreter gets the same codes as the shell
+    """
+    code = ERROR_INTERNAL
+    title = 'Internal'
+
+    def __init__(self, message: str, line: int = 0):
+        """
+        @param message: Description of the error
+        @param line: Number of the line where error occurred
+        """
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+    def write(self, stream):
+        """
+        Writes the error message in the format of the interpreter
+        @param stream: Text stream for the message
+        """
+        stream.write(
+            'ERROR: ' + self.title + '\n'
+            + self.message + '\n'
+            + 'FILE: ' + __file__ + '\n'
+            + 'LINE: ' + str(self.line) + '\n\n'
+        )
+
+
+class InvalidParametersCombination(InterpretError):
+    code = ERROR_INVALID_PARAMS_COMBINATION
+    title = 'InvalidParametersCombination'
+
+
+class OpenInputFile(InterpretError):
+    code = ERROR_OPEN_INPUT_FILE
+    title = 'OpenInputFile'
+
+
+class OpenOutputFile(InterpretError):
+    code = ERROR_OPEN_OUTPUT_FILE
+    title = 'OpenOutputFile'
+
+
+class XmlNotWellFormed(InterpretError):
+    code = ERROR_XML_NOT_WELL_FORMED
+    title = 'XmlNotWellFormed'
+
+
+class XmlUnexpectedStructure(InterpretError):
+    code = ERROR_XML_UNEXPECTED_STRUCTURE
+    title = 'XmlUnexpectedStructure'
+
+
+class SemanticControl(InterpretError):
+    code = ERROR_SEMANTIC_CONTROL
+    title = 'SemanticControl'
+
+
+class WrongOperands(InterpretError):
+    code = ERROR_WRONG_OPERANDS
+    title = 'WrongOperands'
+
+
+class NonExistentVariable(InterpretError):
+    code = ERROR_NON_EXISTENT_VARIABLE
+    title = 'NonExistentVariable'
+
+
+class NonExistentFrame(InterpretError):
+    code = ERROR_NON_EXISTENT_FRAME
+    title = 'NonExistentFrame'
+
+
+class MissingValue(InterpretError):
+    code = ERROR_MISSING_VALUE
+    title = 'MissingValue'
+
+
+class WrongOperandValue(InterpretError):
+    code = ERROR_WRONG_OPERAND_VALUE
+    title = 'WrongOperandValue'
+
+
+class WorkingWithString(InterpretError):
+    code = ERROR_WORKING_WITH_STRING
+    title = 'WorkingWithString'
+
+
+class Internal(InterpretError):
+    code = ERROR_INTERNAL
+    title = 'Internal'
+
+
+class LimitExceeded(InterpretError):
+    """
+    The program exceeded the limit of the steps or of the output given by the embedding program
+    """
+    code = ERROR_INTERNAL
+    title = 'LimitExceeded'
+
+
+# The classes of the errors by their exit codes
+error_classes = {
+    error_class.code: error_class for error_class in (
+        InvalidParametersCombination, OpenInputFile, OpenOutputFile, XmlNotWellFormed, XmlUnexpectedStructure,
+        SemanticControl, WrongOperands, NonExistentVariable, NonExistentFrame, MissingValue, WrongOperandValue,
+        WorkingWithString, Internal
+    )
+}
+
+
+class ProgramExit(Exception):
+    """
+    The program ended by the EXIT instruction
+    """
+
+    def __init__(self, code: int):
+        """
+        @param code: Return code of the program
+        """
+        super().__init__(code)
+        self.code = code
+
+
+# endregion
+
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024  # Size limit of the cache of the loaded programs in bytes
+CACHE_EXTENSION = '.ippc'
+PYTHON_CACHE_EXTENSION = '.ippy'  # Extension of the cached code of the Python engine
+DEFAULT_OUTPUT_BUFFER_SIZE = 64 * 1024  # Size of the buffer of the standard output in chars
+JIT_THRESHOLD = 50  # Number of the jumps back to the label after which the loop is traced
+JIT_MAX_TRACE_LENGTH = 1000  # Number of the instructions after which the recording of the trace is stopped
+
 def print_error_message(message, error_code, line):
     """
-	The function prints error message on the stderr (Standard error output)
-	@param message:		Gets message which will be printed on the stderr
-	@param error_code:	The function exits with the error code
+	The function raises the error of the interpretation, the error message is written by the caller of the interpreter
+	@param message:		Message of the error
+	@param error_code:	The exit code of the error which selects the class of the error
 	@param line:        Number of the line where error occurred
 	"""
-    sys.stderr.write('ERROR: ')
-
-    error_title = ''
-    if error_code == ERROR_INVALID_PARAMS_COMBINATION:
-        error_title = 'InvalidParametersCombination'
-    elif error_code == ERROR_OPEN_INPUT_FILE:
-        error_title = 'OpenInputFile'
-    elif error_code == ERROR_OPEN_OUTPUT_FILE:
-        error_title = 'OpenOutputFile'
-    elif error_code == ERROR_XML_NOT_WELL_FORMED:
-        error_title = 'XmlNotWellFormed'
-    elif error_code == ERROR_XML_UNEXPECTED_STRUCTURE:
-        error_title = 'XmlUnexpectedStructure'
-    elif error_code == ERROR_SEMANTIC_CONTROL:
-        error_title = 'SemanticControl'
-    elif error_code == ERROR_WRONG_OPERANDS:
-        error_title = 'WrongOperands'
-    elif error_code == ERROR_NON_EXISTENT_VARIABLE:
-        error_title = 'NonExistentVariable'
-    elif error_code == ERROR_NON_EXISTENT_FRAME:
-        error_title = 'NonExistentFrame'
-    elif error_code == ERROR_MISSING_VALUE:
-        error_title = 'MissingValue'
-    elif error_code == ERROR_WRONG_OPERAND_VALUE:
-        error_title = 'WrongOperandValue'
-    elif error_code == ERROR_WORKING_WITH_STRING:
-        error_title = 'WorkingWithString'
-    elif error_code == ERROR_INTERNAL:
-        error_title = 'Internal'
-
-    sys.stderr.write(error_title + '\n')
-
-    sys.stderr.write(message + '\n')
-    sys.stderr.write('FILE: ' + __file__ + '\n')
-    sys.stderr.write('LINE: ' + str(line) + '\n\n')
-    exit(error_code)
+    raise error_classes.get(error_code, InterpretError)(message, line)
 
 
 def print_help_message():
@@ -87,6 +204,19 @@ def print_help_message():
     print("\t--help\t\t\tDisplay this message")
     print("\t--source=FILE\t\tSet source file")
     print("\t--input=FILE\t\tSet input file")
+    print("\t--cache=DIR\t\tCache loaded programs in directory")
+    print("\t--cache-size=BYTES\tSet size limit of the cache (default 64 MiB)")
+    print("\t--output-buffer=SIZE\tSet size of the output buffer in chars (default 65536, 0 is unbuffered)")
+    print("\t--interleave\t\tFlush the output before DPRINT and BREAK write to the stderr")
+    print("\t--profile=PREFIX\tWrite counts and times of the instructions to PREFIX.txt and PREFIX.json")
+    print("\t--trace=N\t\tRemember last N instructions and dump them on error or on SIGUSR1")
+    print("\t--trace-file=FILE\tDump the trace to the file instead of the stderr")
+    print("\t--optimize\t\tFold constants and fuse common sequences of the instructions")
+    print("\t--show-fusions\t\tPrint the fused sequences to the stderr (enables --optimize)")
+    print("\t--engine=ENGINE\t\tSet engine of the interpretation: default, closure, python, jit")
+    print("\t--batch=PATTERN\t\tInterpret the program with every input file of the directory or glob pattern")
+    print("\t--batch-output=DIR\tWrite the results of the batch to the directory (default JSON lines to stdout)")
+    print("\t--jobs=N\t\tNumber of the workers of the batch (default the number of the processors)")
     print()
     print("Exit status:")
     print("\t0\t\tOK,")
@@ -130,6 +260,8 @@ class Label:
     The label contains name and order attributes
     """
 
+    __slots__ = ('name', 'order')
+
     def __init__(self, name, order):
         self.name = name
         self.order = order
@@ -140,6 +272,8 @@ class Instruction:
     The instruction contains order, opcode and arguments attributes
 	"""
 
+    __slots__ = ('order', 'opcode', 'source_opcode', 'arguments', 'function', 'operands')
+
     def __init__(self, order: str, opcode: str, arguments):
         """
         @param order: Order number
@@ -155,7 +289,10 @@ class Instruction:
                 inspect.currentframe().f_lineno
             )
         self.opcode = opcode
+        self.source_opcode = opcode  # Opcode in the source, the profile and the trace report it after folding too
         self.arguments = arguments
+        self.function = None  # Function of the instruction resolved by its opcode
+        self.operands = ()  # Decoded arguments of the instruction
         if self.order < 1:
             print_error_message(
                 'Invalid instruction order number',
@@ -175,6 +312,8 @@ class Argument:
 	The argument contains type and value attributes
 	"""
 
+    __slots__ = ('type', 'value')
+
     def __init__(self, arg_type: str, value):
         """
         @param arg_type: Type of the argument
@@ -189,6 +328,8 @@ class Variable:
 	The variable contains name, type, value and is_init attributes
 	"""
 
+    __slots__ = ('name', 'type', 'value', 'is_init')
+
     def __init__(self, variable_name, variable_type=None, variable_value=None):
         """
         @param variable_name: Name of the variable
@@ -252,7 +393,8 @@ class Variable:
             value = ''
 
         if self.type is Type.STRING:
-            self.value = translate_to_normal_string(str(value))
+            # Strings are translated only once when the literals are loaded
+            self.value = str(value)
         elif self.type is Type.INT:
             try:
                 self.value = int(value)
@@ -302,74 +444,68 @@ class Variable:
 
 class Frame:
     """
-	The frame contains list of variables and functions for working with that list
+	The frame contains variables by their names and functions for working with them
 	"""
 
     def __init__(self):
-        self.variables = []
+        self.variables = {}
 
     def add(self, variable: Variable):
         """
         The function checks variable redefinition
-        then add it to the list
-        @param variable: The variable which will be added to the list of variables
+        then add it to the variables
+        @param variable: The variable which will be added to the variables
         """
-        for var in self.variables:
-            if var.name == variable.name:
-                print_error_message(
-                    'Variable redefinition: ' + variable.name,
-                    ERROR_SEMANTIC_CONTROL,
-                    inspect.currentframe().f_lineno
-                )
+        if variable.name in self.variables:
+            print_error_message(
+                'Variable redefinition: ' + variable.name,
+                ERROR_SEMANTIC_CONTROL,
+                inspect.currentframe().f_lineno
+            )
 
-        self.variables.append(variable)
+        self.variables[variable.name] = variable
 
     def remove(self, variable: Variable):
         """
-        The function removes variable from list of variables
+        The function removes variable from the variables
         @param variable: The variable which will be deleted
         """
-        self.variables.remove(variable)
+        del self.variables[variable.name]
 
     def contain_var(self, var_name: str):
         """
-        The function checks if variable is in list of variables
+        The function checks if variable is in the variables
         @param var_name: Name for check
         @return: If variable is in frame
         """
-        for var in self.variables:
-            if var.name == var_name:
-                return True
-
-        return False
+        return var_name in self.variables
 
     def get_variable(self, var_name: str):
         """
         Gets variable from frame by its name
         @param var_name: Name of the variable which will be returned
         """
-        for var in self.variables:
-            if var.name == var_name:
-                return var
-
-        # Raise error if variable is not in the list -> Working with undefined variable
-        print_error_message(
-            'Non existent variable: ' + var_name,
-            ERROR_NON_EXISTENT_VARIABLE,
-            inspect.currentframe().f_lineno
-        )
+        try:
+            return self.variables[var_name]
+        except KeyError:
+            # Raise error if variable is not in the variables -> Working with undefined variable
+            print_error_message(
+                'Non existent variable: ' + var_name,
+                ERROR_NON_EXISTENT_VARIABLE,
+                inspect.currentframe().f_lineno
+            )
 
     def update_var(self, variable: Variable):
         """
-        Remove old variable and then add new one with the same name
+        Replaces old variable by new one with the same name
         @param variable: New variable
         """
-        self.remove(self.get_variable(variable.name))
-        self.add(variable)
+        self.get_variable(variable.name)
+        self.variables[variable.name] = variable
 
-    def print_content_to_stderr(self):
-        for var in self.variables:
-            sys.stderr.write(
+    def print_content_to_stderr(self, stream):
+        for var in self.variables.values():
+            stream.write(
                 '\t' + var.name + ' '
                 + str(var.type) + ' '
                 + str(var.value) + ' '
@@ -422,6 +558,25 @@ class Frames:
 
         return self.temporary_frame
 
+    def find_variable(self, frame_opcode: str, var_name: str):
+        """
+        Finds the variable without raising errors
+        @param frame_opcode: Label of the frame
+        @param var_name: Name of the variable
+        @return: The variable or None if the frame or the variable doesn't exist
+        """
+        if frame_opcode == 'GF':
+            frame = self.global_frame
+        elif frame_opcode == 'LF':
+            frame = self.local_frames[-1] if self.local_frames else None
+        else:
+            frame = self.temporary_frame
+
+        if frame is None:
+            return None
+
+        return frame.variables.get(var_name)
+
     def create_tf(self):
         """
         Creates new temporary frame
@@ -449,22 +604,22 @@ class Frames:
 
         self.temporary_frame = self.local_frames.pop()
 
-    def print_frames_to_stderr(self):
-        sys.stderr.write('The format of the variables: NAME TYPE VALUE IS_INITIALIZED\n')
-        sys.stderr.write('The content of the global frame:\n')
-        self.get_gf().print_content_to_stderr()
+    def print_frames_to_stderr(self, stream):
+        stream.write('The format of the variables: NAME TYPE VALUE IS_INITIALIZED\n')
+        stream.write('The content of the global frame:\n')
+        self.get_gf().print_content_to_stderr(stream)
 
         if self.local_frames:
-            sys.stderr.write('The content of the local frame:\n')
-            self.get_lf().print_content_to_stderr()
+            stream.write('The content of the local frame:\n')
+            self.get_lf().print_content_to_stderr(stream)
         else:
-            sys.stderr.write('The local frame is uninitialized\n')
+            stream.write('The local frame is uninitialized\n')
 
         if self.temporary_frame is not None:
-            sys.stderr.write('The content of the temporary frame\n')
-            self.get_tf().print_content_to_stderr()
+            stream.write('The content of the temporary frame\n')
+            self.get_tf().print_content_to_stderr(stream)
         else:
-            sys.stderr.write('The temporary frame is uninitialized:\n')
+            stream.write('The temporary frame is uninitialized:\n')
 
 
 class Stack:
@@ -503,6 +658,327 @@ class Stack:
             self.pop()
 
 
+class DataStack:
+    """
+    The stack of the STACK extension, the types and the values are stored in two parallel lists,
+    so no variable is created for the pushed value
+    """
+
+    def __init__(self):
+        self.types = []
+        self.values = []
+
+    def push(self, var_type: Type, value):
+        """
+        Appends the type and the value to the stack
+        @param var_type: Type of the value
+        @param value: The value which will be appended
+        """
+        self.types.append(var_type)
+        self.values.append(value)
+
+    def pop(self) -> tuple:
+        """
+        Checks if the stack is not empty
+        then pops the last value
+        @return: Type and value of the last value
+        """
+        if not self.values:
+            # Emptiness raises error
+            print_error_message(
+                'Pop from empty stack',
+                ERROR_MISSING_VALUE,
+                inspect.currentframe().f_lineno
+            )
+
+        return self.types.pop(), self.values.pop()
+
+    def pop_two(self) -> tuple:
+        """
+        Checks if the stack contains two values
+        then pops the last two values
+        @return: Type and value of the second last value, type and value of the last value
+        """
+        if len(self.values) < 2:
+            # Emptiness raises error
+            print_error_message(
+                'Pop from empty stack',
+                ERROR_MISSING_VALUE,
+                inspect.currentframe().f_lineno
+            )
+
+        type2 = self.types.pop()
+        value2 = self.values.pop()
+
+        return self.types.pop(), self.values.pop(), type2, value2
+
+    def clear(self):
+        """
+        Removes all values, the lists are replaced, so the clearing doesn't depend on the size of the stack
+        """
+        self.types = []
+        self.values = []
+
+
+class InputReader:
+    """
+    The reader of the input lines for the READ instruction, the lines are read one by one when they are needed
+    """
+
+    def __init__(self, stream):
+        """
+        @param stream: Binary stream or file mapped into the memory
+        """
+        self.stream = stream
+
+    def read_line(self):
+        """
+        Reads the next line from the stream
+        @return: The line without the end of line or None at the end of the input
+        """
+        line = self.stream.readline()
+
+        if not line:
+            return None
+
+        # Removes the end of line
+        if line[-1:] == b'\n':
+            line = line[:-1]
+            if line[-1:] == b'\r':
+                line = line[:-1]
+
+        return line.decode('utf-8', 'replace')
+
+
+class Output:
+    """
+    The output of the program, written values are collected in the buffer
+    and then written to the stream as encoded bytes in bulk
+    """
+
+    def __init__(self, stream, buffer_size: int = DEFAULT_OUTPUT_BUFFER_SIZE, interleave: bool = False,
+                 encoding: str = 'utf-8', errors: str = 'strict', limit: float = float('inf')):
+        """
+        @param stream: Binary stream for the output
+        @param buffer_size: Number of chars in the buffer which causes flush
+        @param interleave: If the output is flushed before writing to the stderr
+        @param encoding: Encoding of the output
+        @param errors: Handling of the encoding errors
+        @param limit: Maximal number of the written bytes
+        """
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.interleave = interleave
+        self.encoding = encoding
+        self.errors = errors
+        self.limit = limit
+        self.written = 0  # Number of the bytes written to the stream
+        self.buffer = []
+        self.size = 0
+
+    def write(self, text: str):
+        """
+        Appends the text to the buffer and flushes the buffer if it's full
+        @param text: The text which will be written
+        """
+        self.buffer.append(text)
+        self.size += len(text)
+
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffer to the stream
+        The limit is checked by the flushes, so the writing of the values is not slowed down,
+        the output over the limit is cut off
+        """
+        if self.buffer:
+            data = ''.join(self.buffer).encode(self.encoding, self.errors)
+            self.buffer = []
+            self.size = 0
+
+            if self.written + len(data) > self.limit:
+                self.stream.write(data[:self.limit - self.written])
+                self.written = self.limit
+                self.stream.flush()
+                raise LimitExceeded(
+                    'Limit of the output exceeded: ' + str(self.limit) + ' bytes',
+                    inspect.currentframe().f_lineno
+                )
+
+            self.stream.write(data)
+            self.written += len(data)
+
+        self.stream.flush()
+
+    def flush_before_stderr(self):
+        """
+        Flushes the buffer before writing to the stderr if the output is interleaved with the stderr
+        """
+        if self.interleave:
+            self.flush()
+
+
+class Profile:
+    """
+    The execution counts and the times of the instructions measured by the profiled interpretation
+    """
+
+    def __init__(self, number_of_instructions: int):
+        """
+        @param number_of_instructions: Number of the instructions of the program
+        """
+        self.counts = [0] * number_of_instructions  # Execution counts by the iterations
+        self.times = [0.0] * number_of_instructions  # Cumulative times in seconds by the iterations
+        self.start = time.perf_counter()
+
+    def get_report(self, instructions: list) -> dict:
+        """
+        Summarizes the measured counts and times by the opcodes and by the orders of the instructions,
+        both sorted from the slowest
+        @param instructions: Instructions of the program
+        @return: The report
+        """
+        opcodes = {}
+        sites = []
+        for ins, count, seconds in zip(instructions, self.counts, self.times):
+            if count == 0:
+                continue
+
+            summary = opcodes.setdefault(ins.source_opcode, {'opcode': ins.source_opcode, 'count': 0, 'time': 0.0})
+            summary['count'] += count
+            summary['time'] += seconds
+            sites.append({'order': ins.order, 'opcode': ins.source_opcode, 'count': count, 'time': seconds})
+
+        return {
+            'total_time': time.perf_counter() - self.start,
+            'instructions': sum(self.counts),
+            'opcodes': sorted(opcodes.values(), key=lambda summary: summary['time'], reverse=True),
+            'sites': sorted(sites, key=lambda site: site['time'], reverse=True),
+        }
+
+    def write_report(self, prefix: str, instructions: list):
+        """
+        Writes the report as text to the file PREFIX.txt and as JSON to the file PREFIX.json
+        @param prefix: Prefix of the names of the files
+        @param instructions: Instructions of the program
+        """
+        report = self.get_report(instructions)
+
+        lines = [
+            'Total time: %.6f s' % report['total_time'],
+            'Executed instructions: %d' % report['instructions'],
+            '',
+            '%-12s %12s %12s' % ('OPCODE', 'COUNT', 'SECONDS'),
+        ]
+        for summary in report['opcodes']:
+            lines.append('%-12s %12d %12.6f' % (summary['opcode'], summary['count'], summary['time']))
+
+        lines.append('')
+        lines.append('%8s %-12s %12s %12s' % ('ORDER', 'OPCODE', 'COUNT', 'SECONDS'))
+        for site in report['sites']:
+            lines.append('%8d %-12s %12d %12.6f' % (site['order'], site['opcode'], site['count'], site['time']))
+
+        try:
+            with open(prefix + '.txt', 'w') as f:
+                f.write('\n'.join(lines) + '\n')
+            with open(prefix + '.json', 'w') as f:
+                json.dump(report, f, indent=2)
+        except OSError:
+            print_error_message(
+                'Profile can\'t be written\nPrefix: ' + prefix,
+                ERROR_OPEN_OUTPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+
+
+class Trace:
+    """
+    The ring buffer of the last proceeded instructions with the values of their operands before the instructions
+    """
+
+    def __init__(self, size: int, file_name=None):
+        """
+        @param size: Number of the remembered instructions
+        @param file_name: Name of the file for the dump or None for the stderr
+        """
+        self.records = collections.deque(maxlen=size)
+        self.file_name = file_name
+
+    def dump(self, program):
+        """
+        Writes the remembered instructions from the oldest to the stderr or to the file
+        @param program: The traced program
+        """
+        # Names of the labels by the iterations of the jumps to them, they are taken from the LABEL instructions,
+        # so the names don't depend on the way the program was loaded
+        label_names = {
+            iteration: ins.operands[0]
+            for iteration, ins in enumerate(program.instructions)
+            if ins.opcode == 'LABEL'
+        }
+
+        lines = ['Trace of the last ' + str(len(self.records)) + ' proceeded instructions:']
+        for iteration, snapshot in self.records:
+            ins = program.instructions[iteration]
+            operands = [format_traced_operand(operand, label_names) for operand in snapshot]
+            lines.append('%8d %-12s %s' % (ins.order, ins.source_opcode, ' '.join(operands)))
+        text = '\n'.join(lines) + '\n'
+
+        if self.file_name is None:
+            sys.stderr.write(text)
+            return
+
+        try:
+            with open(self.file_name, 'w') as f:
+                f.write(text)
+        except OSError:
+            print_error_message(
+                'Trace can\'t be written\nFile name: ' + self.file_name,
+                ERROR_OPEN_OUTPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+
+
+def format_traced_value(var_type: Type, value) -> str:
+    """
+    @param var_type: Type of the value
+    @param value: The value
+    @return: The value in IPPcode22 notation, long strings are shortened
+    """
+    if var_type is Type.NULL:
+        return 'nil@nil'
+    elif var_type is Type.BOOLEAN:
+        return 'bool@true' if value else 'bool@false'
+    elif var_type is Type.INT:
+        return 'int@' + str(value)
+    elif var_type is Type.STRING:
+        return 'string@' + (value if len(value) <= 40 else value[:40] + '...')
+
+    return '<uninitialized>'
+
+
+def format_traced_operand(operand, label_names: dict) -> str:
+    """
+    @param operand: Operand remembered by the trace
+    @param label_names: Names of the labels by the iterations of the jumps to them
+    @return: The operand in IPPcode22 notation
+    """
+    # Variable is remembered as the triple of the pair of the frame and the name, the type and the value
+    if type(operand) is tuple:
+        name = operand[0][0] + '@' + operand[0][1]
+        if operand[1] is None:
+            return name + '=<undefined>'
+        return name + '=' + format_traced_value(operand[1], operand[2])
+    elif type(operand) is Variable:
+        return format_traced_value(operand.type, operand.value)
+    elif type(operand) is int:
+        return 'label@' + label_names.get(operand, str(operand))
+
+    return str(operand)
+
+
 def math_operation(dest: Variable, operand1: Variable, operand2: Variable, operation: str):
     """
     Calculates math problem
@@ -773,102 +1249,298 @@ def stri2int(dest: Variable, var_string: Variable, var_int: Variable):
     dest.is_init = True
 
 
-class Program:
+def fold_constant(opcode: str, constants: tuple):
     """
-    The program contains iteration, instructions, labels, frames, input_lines, stack and stack_calls as its attributes
-    The program contains functions for working with its attributes, and functions for instructions
+    Calculates the result of the instruction with the constant operands
+    The result is not calculated if the instruction would raise an error, so the error is raised when it's proceeded
+    @param opcode: Opcode of the instruction
+    @param constants: Constant operands of the instruction without the destination variable
+    @return: Constant variable with the result or None if the instruction can't be folded
+    """
+    types = tuple(constant.type for constant in constants)
+    values = tuple(constant.value for constant in constants)
+
+    if opcode in ('ADD', 'SUB', 'MUL', 'IDIV'):
+        if types != (Type.INT, Type.INT):
+            return None
+        if opcode == 'ADD':
+            return Variable(None, Type.INT, values[0] + values[1])
+        elif opcode == 'SUB':
+            return Variable(None, Type.INT, values[0] - values[1])
+        elif opcode == 'MUL':
+            return Variable(None, Type.INT, values[0] * values[1])
+        elif values[1] != 0:
+            return Variable(None, Type.INT, values[0] // values[1])
+    elif opcode == 'LT' or opcode == 'GT':
+        # Nil can't be compared by LT and GT
+        if types[0] is not types[1] or types[0] is Type.NULL:
+            return None
+        if opcode == 'LT':
+            return Variable(None, Type.BOOLEAN, values[0] < values[1])
+        return Variable(None, Type.BOOLEAN, values[0] > values[1])
+    elif opcode == 'EQ':
+        if types[0] is not types[1] and types[0] is not Type.NULL and types[1] is not Type.NULL:
+            return None
+        return Variable(None, Type.BOOLEAN, values[0] == values[1])
+    elif opcode == 'AND' or opcode == 'OR':
+        if types != (Type.BOOLEAN, Type.BOOLEAN):
+            return None
+        if opcode == 'AND':
+            return Variable(None, Type.BOOLEAN, values[0] and values[1])
+        return Variable(None, Type.BOOLEAN, values[0] or values[1])
+    elif opcode == 'NOT':
+        if types == (Type.BOOLEAN,):
+            return Variable(None, Type.BOOLEAN, not values[0])
+    elif opcode == 'INT2CHAR':
+        if types == (Type.INT,) and 0 <= values[0] <= sys.maxunicode:
+            return Variable(None, Type.STRING, chr(values[0]))
+    elif opcode == 'STRI2INT' or opcode == 'GETCHAR':
+        if types != (Type.STRING, Type.INT) or not 0 <= values[1] < len(values[0]):
+            return None
+        if opcode == 'STRI2INT':
+            return Variable(None, Type.INT, ord(values[0][values[1]]))
+        return Variable(None, Type.STRING, values[0][values[1]])
+    elif opcode == 'CONCAT':
+        if types == (Type.STRING, Type.STRING):
+            return Variable(None, Type.STRING, values[0] + values[1])
+    elif opcode == 'STRLEN':
+        if types == (Type.STRING,):
+            return Variable(None, Type.INT, len(values[0]))
+    elif opcode == 'TYPE':
+        names = {Type.INT: 'int', Type.STRING: 'string', Type.BOOLEAN: 'bool', Type.NULL: 'nil'}
+        return Variable(None, Type.STRING, names[types[0]])
+
+    return None
+
+
+def get_operand_type(operand, types: dict):
+    """
+    @param operand: Decoded operand of the instruction
+    @param types: Known types of the global variables
+    @return: Type of the initialized operand or None if it's not known
     """
+    if type(operand) is tuple:
+        # Only the types of the global variables are known
+        if operand[0] == 'GF':
+            return types.get(operand)
+        return None
 
-    def __init__(self, input_lines: list):
-        """
-        @param input_lines: List of inputs
-        """
-        self.iteration = 0
-        self.number_of_proceeded_functions = 0
-        self.instructions = []
-        self.labels = []
-        self.frames = Frames()
-        self.input_lines = input_lines
-        self.stack = Stack()  # Stack of variables
-        self.stack_calls = Stack()  # Stack of calls
+    return operand.type
 
-    def add_label(self, label):
-        """
-        Checks label validity, then add it to the list of labels
-        @param label:   Label which will be added to the list of labels
-        """
-        for lab in self.labels:
-            if lab.name == label.name:
-                print_error_message(
-                    'Label redefinition: ' + label.name,
-                    ERROR_SEMANTIC_CONTROL,
-                    inspect.currentframe().f_lineno
-                )
 
-        # Appending the label to the list of labels
-        self.labels.append(label)
+def update_types(ins, types: dict):
+    """
+    Updates the known types of the global variables by the instruction
+    @param ins: Proceeded instruction
+    @param types: Known types of the global variables
+    """
+    if Program.operands_kinds[ins.opcode][:1] != ('var',) or ins.operands[0][0] != 'GF':
+        return
 
-    def get_label(self, label_name: str) -> Label:
-        """
-        Gets a label from the list by name
-        If the label with the name does not exist then raises undefined label error
-        @param label_name:  Name of the label which will be returned
-        @return: Label by name
-        """
+    if ins.opcode == 'MOVE':
+        var_type = get_operand_type(ins.operands[1], types)
+    else:
+        var_type = Program.result_types.get(ins.opcode)
 
-        labels = self.labels
+    if var_type is None:
+        types.pop(ins.operands[0], None)
+    else:
+        types[ins.operands[0]] = var_type
 
-        # Cycle through labels
-        for label in labels:
-            if label.name == label_name:
-                return label
 
-        # Label was not found in list of labels
+def stack_math(type1: Type, value1, type2: Type, value2, operation: str) -> int:
+    """
+    Calculates math problem of the values from the stack
+    @param type1: Type of the first operand
+    @param value1: Value of the first operand
+    @param type2: Type of the second operand
+    @param value2: Value of the second operand
+    @param operation: Mathematical operation
+    @return: Result of the operation
+    """
+    # Operation can be called only by INTs types
+    if type1 is not Type.INT or type2 is not Type.INT:
         print_error_message(
-            'Undefined label',
-            ERROR_SEMANTIC_CONTROL,
+            'Wrong type\nFunction: stack_math',
+            ERROR_WRONG_OPERANDS,
             inspect.currentframe().f_lineno
         )
 
-    def load_labels(self):
-        """
-        Loops through instructions and add labels to the list of labels
-        """
-        for ins in self.instructions:
-            if ins.opcode == 'LABEL':
-                self.add_label(Label(ins.arguments[0].value, ins.order))
+    if operation == '+':
+        return value1 + value2
+    elif operation == '-':
+        return value1 - value2
+    elif operation == '*':
+        return value1 * value2
 
-    def add_instruction(self, instruction):
-        """
-        Checks instruction validity, then add it to the list of instructions
-        @param instruction:     Instruction for check and append
-        """
+    # Division
+    try:
+        return value1 // value2
+    except ZeroDivisionError:
+        print_error_message(
+            'Division by zero',
+            ERROR_WRONG_OPERAND_VALUE,
+            inspect.currentframe().f_lineno
+        )
 
-        # List of the valid instructions
-        valid_instructions = ['MOVE', 'CREATEFRAME', 'PUSHFRAME', 'POPFRAME', 'DEFVAR', 'CALL', 'RETURN',
-                              'PUSHS', 'POPS', 'ADD', 'SUB', 'MUL', 'IDIV', 'LT', 'GT', 'EQ', 'AND', 'OR', 'NOT',
-                              'INT2CHAR', 'STRI2INT', 'READ', 'WRITE', 'CONCAT', 'STRLEN', 'GETCHAR', 'SETCHAR',
-                              'TYPE', 'LABEL', 'JUMP', 'JUMPIFEQ', 'JUMPIFNEQ', 'EXIT', 'DPRINT', 'BREAK']
 
-        valid_instructions_extension = ['CLEARS', 'ADDS', 'SUBS', 'MULS', 'IDIVS', 'LTS', 'GTS', 'EQS', 'ANDS',
-                                        'ORS', 'NOTS', 'INT2CHARS', 'STRI2INTS', 'JUMPIFEQS', 'JUMPIFNEQS']
+def stack_compare(type1: Type, value1, type2: Type, value2, operation: str) -> bool:
+    """
+    Compares two values from the stack
+    @param type1: Type of the first operand
+    @param value1: Value of the first operand
+    @param type2: Type of the second operand
+    @param value2: Value of the second operand
+    @param operation: Operation e.g. EQ, NEQ, LT, GT
+    @return: The veracity of the operation
+    """
+    # Checks type compatibility
+    if type1 is not type2 and type1 is not Type.NULL and type2 is not Type.NULL:
+        print_error_message(
+            'Different types in comparison\nFunction: stack_compare',
+            ERROR_WRONG_OPERANDS,
+            inspect.currentframe().f_lineno
+        )
 
-        # Check OPCODE validity
-        if instruction.opcode not in valid_instructions and instruction.opcode not in valid_instructions_extension:
-            print_error_message(
-                'Invalid instruction opcode: ' + instruction.opcode,
-                ERROR_XML_UNEXPECTED_STRUCTURE,
-                inspect.currentframe().f_lineno
-            )
+    if operation == '==':
+        return value1 == value2
+    elif operation == '!=':
+        return value1 != value2
 
-        # Check ORDER duplication validity
-        for ins in self.instructions:
-            if ins.order == instruction.order:
-                print_error_message(
-                    'Duplicate instruction order',
-                    ERROR_XML_UNEXPECTED_STRUCTURE,
-                    inspect.currentframe().f_lineno
-                )
+    # Nil can't be compared by LT and GT
+    try:
+        return value1 < value2 if operation == '<' else value1 > value2
+    except TypeError:
+        print_error_message(
+            'Type error in comparison',
+            ERROR_WRONG_OPERANDS,
+            inspect.currentframe().f_lineno
+        )
+
+
+def stack_logic(type1: Type, value1, type2, value2, op: str) -> bool:
+    """
+    Logical operations AND, OR, NOT of the values from the stack
+    @param type1: Type of the first operand
+    @param value1: Value of the first operand
+    @param type2: Type of the second operand or None in NOT function
+    @param value2: Value of the second operand or None in NOT function
+    @param op: Logical operation
+    @return: Result of the operation
+    """
+    # Checks the validity of the types
+    if type1 is not Type.BOOLEAN or (op != 'not' and type2 is not Type.BOOLEAN):
+        print_error_message(
+            'Wrong operands types\nInstruction: ' + op.upper() + 'S',
+            ERROR_WRONG_OPERANDS,
+            inspect.currentframe().f_lineno
+        )
+
+    if op == 'and':
+        return value1 and value2
+    elif op == 'or':
+        return value1 or value2
+
+    return not value1
+
+
+class Program:
+    """
+    The program contains iteration, instructions, labels, frames, input_reader, stack and stack_calls as its attributes
+    The program contains functions for working with its attributes, and functions for instructions
+    """
+
+    def __init__(self, input_reader, output: Output, error_stream=None):
+        """
+        @param input_reader: Reader of the input lines for the READ instruction
+        @param output: Output of the WRITE instruction
+        @param error_stream: Text stream of DPRINT and BREAK instructions, the stderr by default
+        """
+        self.iteration = 0
+        self.number_of_proceeded_functions = 0
+        self.block_start = 0  # The iteration where the block of instructions without jump started
+        self.instructions = []
+        self.orders = set()  # Orders of the loaded instructions
+        self.labels = {}  # Labels by their names
+        self.frames = Frames()
+        self.input_reader = input_reader
+        self.output = output
+        self.error_stream = error_stream if error_stream is not None else sys.stderr
+        self.max_steps = float('inf')  # Limit of the proceeded functions checked by the jumps
+        self.stack = DataStack()  # Stack of the values of the variables
+        self.stack_calls = Stack()  # Stack of calls
+
+    def add_label(self, label):
+        """
+        Checks label validity, then add it to the labels
+        @param label:   Label which will be added to the labels
+        """
+        if label.name in self.labels:
+            print_error_message(
+                'Label redefinition: ' + label.name,
+                ERROR_SEMANTIC_CONTROL,
+                inspect.currentframe().f_lineno
+            )
+
+        # Adding the label to the labels by its name
+        self.labels[label.name] = label
+
+    def get_label(self, label_name: str) -> Label:
+        """
+        Gets a label by name
+        If the label with the name does not exist then raises undefined label error
+        @param label_name:  Name of the label which will be returned
+        @return: Label by name
+        """
+        label = self.labels.get(label_name)
+
+        # Label was not found in labels
+        if label is None:
+            print_error_message(
+                'Undefined label: ' + label_name,
+                ERROR_SEMANTIC_CONTROL,
+                inspect.currentframe().f_lineno
+            )
+
+        return label
+
+    def load_labels(self):
+        """
+        Loops through instructions and add labels to the labels
+        then replaces the labels in the jump instructions by the iterations of their targets
+        """
+        for ins in self.instructions:
+            if ins.opcode == 'LABEL':
+                self.add_label(Label(ins.operands[0], ins.order))
+
+        # Resolves the targets of the jumps, undefined labels are found before the interpretation
+        for ins in self.instructions:
+            if ins.opcode != 'LABEL' and Program.operands_kinds[ins.opcode][:1] == ('label',):
+                target = self.get_label(ins.operands[0]).order - 1
+                ins.operands = (target,) + ins.operands[1:]
+
+    def add_instruction(self, instruction):
+        """
+        Checks instruction validity, then add it to the list of instructions
+        @param instruction:     Instruction for check and append
+        """
+        # Check OPCODE validity, valid opcodes are the keys of the table of the functions
+        if instruction.opcode not in Program.functions:
+            print_error_message(
+                'Invalid instruction opcode: ' + instruction.opcode,
+                ERROR_XML_UNEXPECTED_STRUCTURE,
+                inspect.currentframe().f_lineno
+            )
+
+        # Check ORDER duplication validity
+        if instruction.order in self.orders:
+            print_error_message(
+                'Duplicate instruction order',
+                ERROR_XML_UNEXPECTED_STRUCTURE,
+                inspect.currentframe().f_lineno
+            )
+
+        self.orders.add(instruction.order)
 
         # Append the instruction to the list of instructions
         self.instructions.append(instruction)
@@ -887,43 +1559,21 @@ class Program:
         # Sorts by ORDER
         self.instructions.sort(key=Instruction.get_order)
 
+        # Orders are rewritten, so the orders of the loaded instructions are not needed anymore
+        self.orders = set()
+
         # Rewrites ORDER
         rewrite_order = 1
         for ins in self.instructions:
             ins.order = rewrite_order
             rewrite_order += 1
 
-    def get_argument(self, position) -> Argument:
-        """
-        The function gets the argument from currently proceeded instruction at the position
-        @param position: The position of argument in instruction list
-        @return: The argument at the position
-        """
-        # Gets currently proceeded instruction
-        instruct = self.get_instruction()
-
-        # Compares the position and the list length due to the validity
-        if len(instruct.arguments) <= position:
-            print_error_message(
-                'Trying to get the argument outside the list',
-                ERROR_XML_UNEXPECTED_STRUCTURE,
-                inspect.currentframe().f_lineno
-            )
-
-        # Returns the argument at the position
-        return instruct.arguments[position]
-
-    def get_frame(self, frame_opcode: str = None) -> Frame:
+    def get_frame(self, frame_opcode: str) -> Frame:
         """
         Returns frame by frame_opcode
         @param frame_opcode: Label of the frame
         @return: Frame
         """
-        # If frame_opcode is empty, it loads it from the first instruction argument
-        if frame_opcode is None:
-            arg = self.get_argument(0)
-            frame_opcode = arg.value[0:2]
-
         # Returns frame by frames_opcode
         if frame_opcode == 'GF':
             # Global frame
@@ -942,164 +1592,177 @@ class Program:
                 inspect.currentframe().f_lineno
             )
 
-    def get_var(self, argument: Argument) -> Variable:
+    def get_var(self, operand) -> Variable:
         """
-        Translates argument into variable
-        @param argument: Argument which will be translated
+        Translates decoded operand into variable
+        @param operand: Pair of the frame and the name of the variable or constant variable
         @return: Translated variable
         """
-        # Gets variable
-        if argument.type == 'var':
-            # Gets the variable from the frame
-            frame = argument.value[0:2]
-            name = argument.value[3:]
-            var = self.get_frame(frame).get_variable(name)
-        else:
-            # Gets the variable from the argument
-            var = Variable(None, argument.type, argument.value)
-
-        return var
-
-    def is_iteration_at_the_end(self) -> bool:
-        """
-        Checks if last instruction was proceeded
-        @return: The veracity of the function
-        """
-        return self.iteration == len(self.instructions)
-
-    def call_function(self, function_opcode: str):
-        """
-        The function calls another function by the function_opcode, then increases iteration
-        @param function_opcode: OPCODE of proceeded function
-        """
-        if function_opcode == "MOVE":
-            self.ins_move()
-        elif function_opcode == "CREATEFRAME":
-            self.ins_createframe()
-        elif function_opcode == "PUSHFRAME":
-            self.ins_pushframe()
-        elif function_opcode == "POPFRAME":
-            self.ins_popframe()
-        elif function_opcode == "DEFVAR":
-            self.ins_defvar()
-        elif function_opcode == "CALL":
-            self.ins_call()
-        elif function_opcode == "RETURN":
-            self.ins_return()
-        elif function_opcode == "PUSHS":
-            self.ins_pushs()
-        elif function_opcode == "POPS":
-            self.ins_pops()
-        elif function_opcode == "ADD":
-            self.ins_add()
-        elif function_opcode == "SUB":
-            self.ins_sub()
-        elif function_opcode == "MUL":
-            self.ins_mul()
-        elif function_opcode == "IDIV":
-            self.ins_idiv()
-        elif function_opcode == "LT":
-            self.ins_lt()
-        elif function_opcode == "GT":
-            self.ins_gt()
-        elif function_opcode == "EQ":
-            self.ins_eq()
-        elif function_opcode == "AND":
-            self.ins_and()
-        elif function_opcode == "OR":
-            self.ins_or()
-        elif function_opcode == "NOT":
-            self.ins_not()
-        elif function_opcode == "INT2CHAR":
-            self.ins_int2char()
-        elif function_opcode == "STRI2INT":
-            self.ins_stri2int()
-        elif function_opcode == "READ":
-            self.ins_read()
-        elif function_opcode == "WRITE":
-            self.ins_write()
-        elif function_opcode == "CONCAT":
-            self.ins_concat()
-        elif function_opcode == "STRLEN":
-            self.ins_strlen()
-        elif function_opcode == "GETCHAR":
-            self.ins_getchar()
-        elif function_opcode == "SETCHAR":
-            self.ins_setchar()
-        elif function_opcode == "TYPE":
-            self.ins_type()
-        elif function_opcode == "LABEL":
-            self.ins_label()
-        elif function_opcode == "JUMP":
-            self.ins_jump()
-        elif function_opcode == "JUMPIFEQ":
-            self.ins_jumpifeq()
-        elif function_opcode == "JUMPIFNEQ":
-            self.ins_jumpifneq()
-        elif function_opcode == "EXIT":
-            self.ins_exit()
-        elif function_opcode == "DPRINT":
-            self.ins_dprint()
-        elif function_opcode == "BREAK":
-            self.ins_break()
-        elif function_opcode == "CLEARS":
-            self.ins_clears()
-        elif function_opcode == "ADDS":
-            self.ins_adds()
-        elif function_opcode == "SUBS":
-            self.ins_subs()
-        elif function_opcode == "MULS":
-            self.ins_muls()
-        elif function_opcode == "IDIVS":
-            self.ins_idivs()
-        elif function_opcode == "LTS":
-            self.ins_lts()
-        elif function_opcode == "GTS":
-            self.ins_gts()
-        elif function_opcode == "EQS":
-            self.ins_eqs()
-        elif function_opcode == "ANDS":
-            self.ins_ands()
-        elif function_opcode == "ORS":
-            self.ins_ors()
-        elif function_opcode == "NOTS":
-            self.ins_nots()
-        elif function_opcode == "INT2CHARS":
-            self.ins_int2chars()
-        elif function_opcode == "STRI2INTS":
-            self.ins_stri2ints()
-        elif function_opcode == "JUMPIFEQS":
-            self.ins_jumpifeqs()
-        elif function_opcode == "JUMPIFNEQS":
-            self.ins_jumpifneqs()
-        else:
-            # Unknown instruction raises error
-            print_error_message(
-                'Unknown instruction ' + function_opcode,
-                ERROR_XML_UNEXPECTED_STRUCTURE,
+        # Gets the variable from the frame
+        if type(operand) is tuple:
+            return self.get_frame(operand[0]).get_variable(operand[1])
+
+        # Constant is already the variable
+        return operand
+
+    def jump(self, iteration: int):
+        """
+        Moves the iteration to the new position
+        The number of proceeded functions is counted by blocks of instructions between two jumps,
+        so the main loop doesn't have to count every proceeded function
+        @param iteration: New iteration, the next proceeded instruction is the following one
+        """
+        self.number_of_proceeded_functions += self.iteration + 1 - self.block_start
+        self.iteration = iteration
+        self.block_start = iteration + 1
+
+        # The program without jumps ends by itself, so only the jumps are limited
+        if self.number_of_proceeded_functions > self.max_steps:
+            raise LimitExceeded(
+                'Limit of the proceeded functions exceeded: ' + str(self.max_steps),
                 inspect.currentframe().f_lineno
             )
-        self.iteration += 1
-        self.number_of_proceeded_functions += 1
+
+    def get_number_of_proceeded_functions(self) -> int:
+        """
+        @return: Number of the proceeded functions before the currently proceeded one
+        """
+        return self.number_of_proceeded_functions + self.iteration - self.block_start
+
+    def load_functions(self):
+        """
+        Resolves the function of every instruction by its opcode
+        """
+        for ins in self.instructions:
+            ins.function = Program.functions[ins.opcode]
+
+    def load_operands(self):
+        """
+        Decodes the arguments of every instruction into operands, so the functions don't process them in every step
+        The arguments are not needed after decoding, so they are freed
+        """
+        # All operands of the same variable or literal share one decoded operand
+        decoded_operands = {}
+
+        for ins in self.instructions:
+            operands_kinds = Program.operands_kinds[ins.opcode]
+
+            # Checks the number of the arguments
+            if len(ins.arguments) != len(operands_kinds):
+                print_error_message(
+                    'Wrong number of the arguments\nInstruction: ' + ins.opcode,
+                    ERROR_XML_UNEXPECTED_STRUCTURE,
+                    inspect.currentframe().f_lineno
+                )
+
+            ins.operands = tuple(
+                decode_operand(argument, kind, decoded_operands)
+                for argument, kind in zip(ins.arguments, operands_kinds)
+            )
+            ins.arguments = ()
+
+    def run(self):
+        """
+        The interpretation of the program, calls functions of the instructions until the iteration reaches the end
+        """
+        # Functions and operands are cached in the local variables, so the loop doesn't look them up in every step
+        steps = [(ins.function, ins.operands) for ins in self.instructions]
+        number_of_instructions = len(steps)
+
+        while self.iteration < number_of_instructions:
+            function, operands = steps[self.iteration]
+            function(self, *operands)
+            self.iteration += 1
+
+    def run_traced(self, trace: Trace):
+        """
+        The interpretation of the program which remembers the last proceeded instructions with the values
+        of their operands, it's the separate loop, so the interpretation without the trace is not slowed down
+        @param trace: The ring buffer of the proceeded instructions
+        """
+        steps = [(ins.function, ins.operands) for ins in self.instructions]
+        number_of_instructions = len(steps)
+        remember = trace.records.append
+        find_variable = self.frames.find_variable
+
+        while self.iteration < number_of_instructions:
+            iteration = self.iteration
+            function, operands = steps[iteration]
+
+            # The values of the variables are remembered before the instruction changes them
+            snapshot = []
+            for operand in operands:
+                if type(operand) is tuple:
+                    var = find_variable(operand[0], operand[1])
+                    if var is None:
+                        snapshot.append((operand, None, None))
+                    else:
+                        snapshot.append((operand, var.type, var.value))
+                else:
+                    snapshot.append(operand)
+            remember((iteration, snapshot))
+
+            function(self, *operands)
+            self.iteration += 1
+
+    def run_profiled(self, profile: Profile):
+        """
+        The interpretation of the program which measures the count and the time of every proceeded instruction,
+        it's the separate loop, so the interpretation without the profile is not slowed down
+        The superinstruction is measured as its first instruction
+        @param profile: Measured counts and times of the instructions
+        """
+        steps = [(ins.function, ins.operands) for ins in self.instructions]
+        number_of_instructions = len(steps)
+        counts = profile.counts
+        times = profile.times
+        perf_counter = time.perf_counter
+
+        while self.iteration < number_of_instructions:
+            iteration = self.iteration
+            function, operands = steps[iteration]
+
+            # The count is incremented before the call, so the instruction which exits is counted too
+            counts[iteration] += 1
+            start = perf_counter()
+            function(self, *operands)
+            times[iteration] += perf_counter() - start
+
+            self.iteration += 1
+
+    def run_engine(self, engine: str, code=None):
+        """
+        The interpretation of the program by the engine selected by parameter --engine
+        @param engine: Name of the engine from the table engines
+        @param code: Compiled code of the python engine by compile_python
+        """
+        if engine == 'closure':
+            self.run_closures()
+        elif engine == 'python':
+            self.run_python(code)
+        elif engine == 'jit':
+            self.run_jit()
+        else:
+            self.run()
 
     # region Instructions
-    def ins_move(self):
+    def ins_move(self, var, symb):
         """
         The function moves a value from the second argument into the first one
         """
         # Loads dest_var
-        dest_var = self.get_var(self.get_argument(0))
+        dest_var = self.get_var(var)
 
         # Gets the variable from the second argument
-        var = self.get_var(self.get_argument(1))
+        symb_var = self.get_var(symb)
 
         # Control of the initialization
-        var.init_control()
+        symb_var.init_control()
 
         # Update variable
         dest_var.is_init = True
-        dest_var.type = var.type
-        dest_var.value = var.value
+        dest_var.type = symb_var.type
+        dest_var.value = symb_var.value
 
     def ins_createframe(self):
         """
@@ -1121,250 +1784,243 @@ class Program:
         """
         self.frames.pop_frame()
 
-    def ins_defvar(self):
+    def ins_defvar(self, var):
         """
         Defines a new variable on frame determined by its argument
         """
-        # Loads the argument
-        arg = self.get_argument(0)
-
-        # Gets a name from the variable
-        name = arg.value[3:]
-
-        # Creates a new uninitialized variable
-        self.get_frame().add(Variable(name))
+        # Creates a new uninitialized variable on the frame
+        frame, name = var
+        self.get_frame(frame).add(Variable(name))
 
-    def ins_call(self):
+    def ins_call(self, target):
         """
         Calls the label and pushs incremented iteration on the stack of calls
         """
-        # Label argument
-        arg1 = self.get_argument(0)
-
-        # Label where program jumps
-        label = self.get_label(arg1.value)
-
         # Pushs incremented iteration on the stack of calls
         self.stack_calls.push(self.iteration)
 
         # Jumps on label
-        self.iteration = label.order - 1
+        self.jump(target)
 
     def ins_return(self):
         """
         Jumps back on the iteration
         """
-        self.iteration = self.stack_calls.pop()
+        self.jump(self.stack_calls.pop())
 
-    def ins_pushs(self):
+    def ins_pushs(self, symb):
         """
-        Pushs the variable on the stack
+        Pushs the value of the variable on the stack
         """
-        var = self.get_var(self.get_argument(0))
+        var = self.get_var(symb)
         var.init_control()
 
-        new_var = Variable(None, var.type, var.value)
+        self.stack.push(var.type, var.value)
 
-        self.stack.push(new_var)
-
-    def ins_pops(self):
+    def ins_pops(self, var):
         """
         Pops the variable from the stack
         """
         # Loads first argument as a variable
-        var = self.get_var(self.get_argument(0))
+        var = self.get_var(var)
 
-        # Gets the variable from the stack
-        var_from_stack: Variable = self.stack.pop()
+        # Gets the value from the stack
+        var_type, value = self.stack.pop()
 
         # Sets destination variable
-        var.set_type(var_from_stack.type)
-        var.set_value(var_from_stack.value)
+        var.type = var_type
+        var.value = value
         var.is_init = True
 
-    def ins_add(self):
+    def ins_add(self, var, symb1, symb2):
         """
         Addition
         """
-        destination = self.get_var(self.get_argument(0))
-        operand1 = self.get_var(self.get_argument(1))
-        operand2 = self.get_var(self.get_argument(2))
+        destination = self.get_var(var)
+        operand1 = self.get_var(symb1)
+        operand2 = self.get_var(symb2)
 
         math_operation(destination, operand1, operand2, '+')
 
-    def ins_sub(self):
+    def ins_sub(self, var, symb1, symb2):
         """
         Substitution
         """
-        destination = self.get_var(self.get_argument(0))
-        operand1 = self.get_var(self.get_argument(1))
-        operand2 = self.get_var(self.get_argument(2))
+        destination = self.get_var(var)
+        operand1 = self.get_var(symb1)
+        operand2 = self.get_var(symb2)
 
         math_operation(destination, operand1, operand2, '-')
 
-    def ins_mul(self):
+    def ins_mul(self, var, symb1, symb2):
         """
         Multiplication
         """
-        destination = self.get_var(self.get_argument(0))
-        operand1 = self.get_var(self.get_argument(1))
-        operand2 = self.get_var(self.get_argument(2))
+        destination = self.get_var(var)
+        operand1 = self.get_var(symb1)
+        operand2 = self.get_var(symb2)
 
         math_operation(destination, operand1, operand2, '*')
 
-    def ins_idiv(self):
+    def ins_idiv(self, var, symb1, symb2):
         """
         INT division
         """
-        destination = self.get_var(self.get_argument(0))
-        operand1 = self.get_var(self.get_argument(1))
-        operand2 = self.get_var(self.get_argument(2))
+        destination = self.get_var(var)
+        operand1 = self.get_var(symb1)
+        operand2 = self.get_var(symb2)
 
         math_operation(destination, operand1, operand2, '//')
 
-    def ins_lt(self):
+    def ins_lt(self, var, symb1, symb2):
         """
         Less than
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         lt_gt_eq(var_dest, var1, var2, '<')
 
-    def ins_gt(self):
+    def ins_gt(self, var, symb1, symb2):
         """
         Greater than
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         lt_gt_eq(var_dest, var1, var2, '>')
 
-    def ins_eq(self):
+    def ins_eq(self, var, symb1, symb2):
         """
         Equal
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         lt_gt_eq(var_dest, var1, var2, '==')
 
-    def ins_and(self):
+    def ins_and(self, var, symb1, symb2):
         """
         AND logical operation
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         and_or_not(var_dest, var1, var2, 'and')
 
-    def ins_or(self):
+    def ins_or(self, var, symb1, symb2):
         """
         OR logical operation
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         and_or_not(var_dest, var1, var2, 'or')
 
-    def ins_not(self):
+    def ins_not(self, var, symb):
         """
         NOT logical operation
         """
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
-        var1 = self.get_var(self.get_argument(1))
+        var1 = self.get_var(symb)
 
         and_or_not(var_dest, var1, None, 'not')
 
-    def ins_int2char(self):
+    def ins_int2char(self, var, symb):
         """
         Translates int to the char value
         """
-        var_dest = self.get_var(self.get_argument(0))
-        var_int = self.get_var(self.get_argument(1))
+        var_dest = self.get_var(var)
+        var_int = self.get_var(symb)
 
         int2char(var_dest, var_int)
 
-    def ins_stri2int(self):
+    def ins_stri2int(self, var, symb1, symb2):
         """
         Saves ordinal value of char in string at the position to the target variable
         """
         # Gets a destination variable
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
         # Gets a string and int parameters
-        var_string = self.get_var(self.get_argument(1))
-        var_int = self.get_var(self.get_argument(2))
+        var_string = self.get_var(symb1)
+        var_int = self.get_var(symb2)
 
         # Sets destination variable
         stri2int(var_dest, var_string, var_int)
 
-    def ins_read(self):
+    def ins_read(self, var, var_type):
         """
         Reads from input file and then saves the value to the variable
         """
         # Destination variable
-        var1 = self.get_var(self.get_argument(0))
-
-        # Gets input value and removes it from the input_lines list, if there is no input value, the program raises error
-        input_value = None
-        try:
-            input_value = self.input_lines[0]
-        except IndexError:
-            print_error_message(
-                'Trying to read from empty input file',
-                ERROR_OPEN_INPUT_FILE,
-                inspect.currentframe().f_lineno
-            )
+        var1 = self.get_var(var)
 
-        del self.input_lines[0]
-
-        var1.set_type(self.get_argument(1).value)
-        var1.set_value(input_value)
+        # Gets the next input line, the end of the input is read as nil
+        input_value = self.input_reader.read_line()
         var1.is_init = True
 
-    def ins_write(self):
+        if input_value is None:
+            var1.type = Type.NULL
+            var1.value = None
+        elif var_type == 'int':
+            # Invalid integer is read as nil
+            try:
+                var1.value = int(input_value)
+                var1.type = Type.INT
+            except ValueError:
+                var1.type = Type.NULL
+                var1.value = None
+        elif var_type == 'bool':
+            var1.type = Type.BOOLEAN
+            var1.value = input_value.lower() == 'true'
+        else:
+            # The input string is not translated as IPPcode22 string
+            var1.type = Type.STRING
+            var1.value = input_value
+
+    def ins_write(self, symb):
         """
         The function prints the argument to the stdout
         """
         # Gets variable from the first argument and then checks its initialization
-        var = self.get_var(self.get_argument(0))
+        var = self.get_var(symb)
         var.init_control()
 
         # Prints variable
         if var.type is Type.NULL:
-            print('', end='')
+            pass
         elif var.type is Type.STRING:
-            print(var.value, end='')
+            self.output.write(var.value)
         elif var.type is Type.BOOLEAN:
             if var.value:
-                print('true', end='')
+                self.output.write('true')
             else:
-                print('false', end='')
+                self.output.write('false')
         else:
-            print(var.value, end='')
+            self.output.write(str(var.value))
 
-    def ins_concat(self):
+    def ins_concat(self, var, symb1, symb2):
         """
         The function concatenates two strings
         """
-        dest_var = self.get_var(self.get_argument(0))
+        dest_var = self.get_var(var)
 
         # Checks initialization of the variables
-        var1 = self.get_var(self.get_argument(1))
+        var1 = self.get_var(symb1)
         var1.init_control()
-        var2 = self.get_var(self.get_argument(2))
+        var2 = self.get_var(symb2)
         var2.init_control()
 
         # Checks the types of the variables
@@ -1379,13 +2035,13 @@ class Program:
         dest_var.set_type(Type.STRING)
         dest_var.value = var1.get_value() + var2.get_value()
 
-    def ins_strlen(self):
+    def ins_strlen(self, var, symb):
         """
         Saves length of the string to the target variable
         """
         # Loads arguments and checks initialization
-        var1 = self.get_var(self.get_argument(0))
-        var2 = self.get_var(self.get_argument(1))
+        var1 = self.get_var(var)
+        var2 = self.get_var(symb)
         var2.init_control()
 
         # Checks type validity
@@ -1404,19 +2060,19 @@ class Program:
         var1.set_value(result_value)
         var1.is_init = True
 
-    def ins_getchar(self):
+    def ins_getchar(self, var, symb1, symb2):
         """
         Gets one char from the position
         """
         # Destination variable
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
 
         # String
-        var_string = self.get_var(self.get_argument(1))
+        var_string = self.get_var(symb1)
         var_string.init_control()
 
         # Position
-        var_int = self.get_var(self.get_argument(2))
+        var_int = self.get_var(symb2)
         var_int.init_control()
 
         # Checks the types of the variables
@@ -1443,20 +2099,20 @@ class Program:
         var_dest.set_value(result_value)
         var_dest.is_init = True
 
-    def ins_setchar(self):
+    def ins_setchar(self, var, symb1, symb2):
         """
         Modify string (first argument) at the position (second argument) as new char (third argument)
         """
         # Destination variable
-        var_dest = self.get_var(self.get_argument(0))
+        var_dest = self.get_var(var)
         var_dest.init_control()
 
         # Position
-        var_int = self.get_var(self.get_argument(1))
+        var_int = self.get_var(symb1)
         var_int.init_control()
 
         # Char for set
-        var_char = self.get_var(self.get_argument(2))
+        var_char = self.get_var(symb2)
         var_char.init_control()
 
         # Checks the types of the variables
@@ -1480,12 +2136,12 @@ class Program:
         char = var_char.value[:1]
         var_dest.set_value(s[:pos] + char + s[pos+1:])
 
-    def ins_type(self):
+    def ins_type(self, var, symb):
         """
         Saves type of the variable (second argument) to the destination variable (first argument)
         """
-        var_dest = self.get_var(self.get_argument(0))
-        var = self.get_var(self.get_argument(1))
+        var_dest = self.get_var(var)
+        var = self.get_var(symb)
 
         # Gets a result value by variable type
         result_value = ''
@@ -1502,50 +2158,40 @@ class Program:
         var_dest.set_value(result_value)
         var_dest.is_init = True
 
-    def ins_label(self):
+    def ins_label(self, label):
         pass
 
-    def ins_jump(self):
+    def ins_jump(self, target):
         """
         Jumps to the label
         """
-        arg = self.get_argument(0)
-        label = self.get_label(arg.value)
-        self.iteration = label.order - 1
+        self.jump(target)
 
-    def ins_jumpifeq(self):
+    def ins_jumpifeq(self, target, symb1, symb2):
         """
         Jumps to the label if the second and third arguments are equal
         """
-        arg1 = self.get_argument(0)
-
-        label: Label = self.get_label(arg1.value)
-
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         if vars_compare(var1, var2, '=='):
-            self.iteration = label.order - 1
+            self.jump(target)
 
-    def ins_jumpifneq(self):
+    def ins_jumpifneq(self, target, symb1, symb2):
         """
         Jumps to the label if the second and third arguments are not equal
         """
-        arg1 = self.get_argument(0)
-
-        label: Label = self.get_label(arg1.value)
-
-        var1 = self.get_var(self.get_argument(1))
-        var2 = self.get_var(self.get_argument(2))
+        var1 = self.get_var(symb1)
+        var2 = self.get_var(symb2)
 
         if vars_compare(var1, var2, '!='):
-            self.iteration = label.order - 1
+            self.jump(target)
 
-    def ins_exit(self):
+    def ins_exit(self, symb):
         """
         Exit program with return code (first argument)
         """
-        var = self.get_var(self.get_argument(0))
+        var = self.get_var(symb)
         var.init_control()
 
         # Checks the type of the variable
@@ -1565,30 +2211,34 @@ class Program:
             )
 
         # Exits program with return code
-        exit(var.value)
+        raise ProgramExit(var.value)
 
-    def ins_dprint(self):
+    def ins_dprint(self, symb):
         """
         Prints message to the stderr
         """
-        var = self.get_var(self.get_argument(0))
+        var = self.get_var(symb)
         var.init_control()
 
+        self.output.flush_before_stderr()
+
         if var.type is Type.STRING:
-            sys.stderr.write(str(var.value) + '\n')
+            self.error_stream.write(str(var.value) + '\n')
         elif var.type is Type.INT:
-            sys.stderr.write(str(var.value) + '\n')
+            self.error_stream.write(str(var.value) + '\n')
         elif var.type is Type.BOOLEAN:
             res = 'true' if var.value else 'false'
-            sys.stderr.write(res + '\n')
+            self.error_stream.write(res + '\n')
 
     def ins_break(self):
         """
         Prints some information to the stderr
         """
-        sys.stderr.write('The iteration number: ' + str(self.iteration) + '\n')
-        sys.stderr.write('The number of the proceeded functions: ' + str(self.number_of_proceeded_functions) + '\n\n')
-        self.frames.print_frames_to_stderr()
+        self.output.flush_before_stderr()
+
+        self.error_stream.write('The iteration number: ' + str(self.iteration) + '\n')
+        self.error_stream.write('The number of the proceeded functions: ' + str(self.get_number_of_proceeded_functions()) + '\n\n')
+        self.frames.print_frames_to_stderr(self.error_stream)
 
     # endregion
 
@@ -1598,255 +2248,1492 @@ class Program:
         self.stack.clear()
 
     def ins_adds(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        math_operation(return_var, sym1, sym2, '+')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.INT, stack_math(type1, value1, type2, value2, '+'))
 
     def ins_subs(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        math_operation(return_var, sym1, sym2, '-')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.INT, stack_math(type1, value1, type2, value2, '-'))
 
     def ins_muls(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        math_operation(return_var, sym1, sym2, '*')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.INT, stack_math(type1, value1, type2, value2, '*'))
 
     def ins_idivs(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        math_operation(return_var, sym1, sym2, '//')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.INT, stack_math(type1, value1, type2, value2, '//'))
 
     def ins_lts(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        lt_gt_eq(return_var, sym1, sym2, '<')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.BOOLEAN, stack_compare(type1, value1, type2, value2, '<'))
 
     def ins_gts(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
-
-        return_var = Variable(None)
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        lt_gt_eq(return_var, sym1, sym2, '>')
-
-        self.stack.push(return_var)
+        self.stack.push(Type.BOOLEAN, stack_compare(type1, value1, type2, value2, '>'))
 
     def ins_eqs(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        return_var = Variable(None)
+        self.stack.push(Type.BOOLEAN, stack_compare(type1, value1, type2, value2, '=='))
 
-        lt_gt_eq(return_var, sym1, sym2, '==')
+    def ins_ands(self):
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        self.stack.push(return_var)
+        self.stack.push(Type.BOOLEAN, stack_logic(type1, value1, type2, value2, 'and'))
 
-    def ins_ands(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+    def ins_ors(self):
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        return_var = Variable(None)
+        self.stack.push(Type.BOOLEAN, stack_logic(type1, value1, type2, value2, 'or'))
 
-        and_or_not(return_var, sym1, sym2, 'and')
+    def ins_nots(self):
+        type1, value1 = self.stack.pop()
 
-        self.stack.push(return_var)
+        self.stack.push(Type.BOOLEAN, stack_logic(type1, value1, None, None, 'not'))
 
-    def ins_ors(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+    def ins_int2chars(self):
+        type1, value1 = self.stack.pop()
 
-        return_var = Variable(None)
+        # Variable has to be integer
+        if type1 is not Type.INT:
+            print_error_message(
+                'Wrong operands types\nFunction: INT2CHARS',
+                ERROR_WRONG_OPERANDS,
+                inspect.currentframe().f_lineno
+            )
 
-        and_or_not(return_var, sym1, sym2, 'or')
+        # Transforms int to the char and catches error ValueError
+        try:
+            char = chr(value1)
+        except (ValueError, OverflowError):
+            print_error_message(
+                'Value error\nInstruction: INT2CHARS',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
 
-        self.stack.push(return_var)
+        self.stack.push(Type.STRING, char)
 
-    def ins_nots(self):
-        sym1 = self.stack.pop()
+    def ins_stri2ints(self):
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        return_var = Variable(None)
+        # Checks the types validity
+        if type1 is not Type.STRING or type2 is not Type.INT:
+            print_error_message(
+                'Incompatible types\nFunction: STRI2INTS',
+                ERROR_WRONG_OPERANDS,
+                inspect.currentframe().f_lineno
+            )
 
-        and_or_not(return_var, sym1, None, 'not')
+        # Checks the index validity
+        if len(value1) <= value2 or value2 < 0:
+            print_error_message(
+                'Index outside string\nFunction: STRI2INTS',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
 
-        self.stack.push(return_var)
+        self.stack.push(Type.INT, ord(value1[value2]))
 
-    def ins_int2chars(self):
-        sym1 = self.stack.pop()
+    def ins_jumpifeqs(self, target):
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        return_var = Variable(None)
+        if stack_compare(type1, value1, type2, value2, '=='):
+            self.jump(target)
 
-        int2char(return_var, sym1)
+    def ins_jumpifneqs(self, target):
+        type1, value1, type2, value2 = self.stack.pop_two()
 
-        self.stack.push(return_var)
+        if stack_compare(type1, value1, type2, value2, '!='):
+            self.jump(target)
 
-    def ins_stri2ints(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+    # endregion
 
-        return_var = Variable(None)
+    # region Constant propagation
 
-        stri2int(return_var, sym1, sym2)
+    def propagate_constants(self):
+        """
+        Propagates the constants and the copies of the variables within the blocks of the instructions
+        and folds the instructions with the constant operands into MOVE of the result
+        The instructions are rewritten, not removed, so the orders, labels and BREAK stay the same,
+        the folded instruction keeps its source_opcode for the profile and the trace
+        """
+        # Known values of the variables, the constant variable or the variable which was copied
+        facts = {}
+        # Variables which are copies of the variable by the copied variable
+        copies = {}
 
-        self.stack.push(return_var)
+        for ins in self.instructions:
+            opcode = ins.opcode
+            operands_kinds = Program.operands_kinds[opcode]
+
+            # The block starts at the label, the following instruction can be reached by jump
+            if opcode == 'LABEL' or opcode in Program.frame_opcodes:
+                facts.clear()
+                copies.clear()
+                continue
+
+            # Replaces the variables by their known values
+            if facts:
+                ins.operands = tuple(
+                    facts.get(operand, operand) if kind == 'symb' and type(operand) is tuple else operand
+                    for operand, kind in zip(ins.operands, operands_kinds)
+                )
 
-    def ins_jumpifeqs(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+            if operands_kinds[:1] == ('var',):
+                dest = ins.operands[0]
+
+                # Folds the instruction if all its operands are constants
+                constants = ins.operands[1:]
+                if opcode in Program.folded_opcodes and all(type(operand) is Variable for operand in constants):
+                    result = fold_constant(opcode, constants)
+                    if result is not None:
+                        ins.opcode = 'MOVE'
+                        ins.function = Program.functions['MOVE']
+                        ins.operands = (dest, result)
+
+                # The destination variable is changed, so its value and its copies are not known
+                facts.pop(dest, None)
+                for copy in copies.pop(dest, ()):
+                    if facts.get(copy) == dest:
+                        del facts[copy]
+
+                if ins.opcode == 'MOVE' and ins.operands[1] != dest:
+                    source = ins.operands[1]
+                    facts[dest] = source
+                    if type(source) is tuple:
+                        copies.setdefault(source, []).append(dest)
+
+            # The block ends by the jump, call, return and exit
+            if opcode in Program.block_end_opcodes:
+                facts.clear()
+                copies.clear()
 
-        label: Label = self.get_label(self.get_argument(0).value)
+    # endregion
 
-        if vars_compare(sym1, sym2, '=='):
-            self.iteration = label.order - 1
+    # region Type inference
 
-    def ins_jumpifneqs(self):
-        sym2 = self.stack.pop()
-        sym1 = self.stack.pop()
+    def ins_add_unchecked(self, var, symb1, symb2):
+        """
+        Addition of the initialized integers
+        """
+        destination = self.get_var(var)
+        destination.value = self.get_var(symb1).value + self.get_var(symb2).value
+        destination.type = Type.INT
+        destination.is_init = True
 
-        label: Label = self.get_label(self.get_argument(0).value)
+    def ins_sub_unchecked(self, var, symb1, symb2):
+        """
+        Substitution of the initialized integers
+        """
+        destination = self.get_var(var)
+        destination.value = self.get_var(symb1).value - self.get_var(symb2).value
+        destination.type = Type.INT
+        destination.is_init = True
 
-        if vars_compare(sym1, sym2, '!='):
-            self.iteration = label.order - 1
+    def ins_mul_unchecked(self, var, symb1, symb2):
+        """
+        Multiplication of the initialized integers
+        """
+        destination = self.get_var(var)
+        destination.value = self.get_var(symb1).value * self.get_var(symb2).value
+        destination.type = Type.INT
+        destination.is_init = True
 
-    # endregion
+    def ins_idiv_unchecked(self, var, symb1, symb2):
+        """
+        INT division of the initialized integers
+        """
+        destination = self.get_var(var)
+        operand1 = self.get_var(symb1)
+        operand2 = self.get_var(symb2)
 
+        if operand2.value == 0:
+            print_error_message(
+                'Division by zero',
+                ERROR_WRONG_OPERAND_VALUE,
+                inspect.currentframe().f_lineno
+            )
 
-def is_char_number(num: str) -> bool:
-    """
-    @param num: Number in string format
-    @return: If char is number
-    """
-    return '0' <= num <= '9'
+        destination.value = operand1.value // operand2.value
+        destination.type = Type.INT
+        destination.is_init = True
 
+    def ins_lt_unchecked(self, var, symb1, symb2):
+        """
+        Less than of the initialized variables of the same type
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = self.get_var(symb1).value < self.get_var(symb2).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-def translate_to_normal_string(source_string: str):
-    """
-    Translates IPPcode22 string to the normal string
-    @param source_string: Source string which will be translated
-    @return: Translated string
-    """
-    # Final string which will be translated
-    final = ''
+    def ins_gt_unchecked(self, var, symb1, symb2):
+        """
+        Greater than of the initialized variables of the same type
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = self.get_var(symb1).value > self.get_var(symb2).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-    # Variable for skipping chars
-    skip = 0
-    for index in range(len(source_string)):
-        # Skipping chars
-        if skip != 0:
-            skip -= 1
-            continue
+    def ins_eq_unchecked(self, var, symb1, symb2):
+        """
+        Equal of the initialized variables of the same type
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = self.get_var(symb1).value == self.get_var(symb2).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-        # Char at the index
-        char = source_string[index]
+    def ins_and_unchecked(self, var, symb1, symb2):
+        """
+        AND of the initialized bools
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = self.get_var(symb1).value and self.get_var(symb2).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-        # Performs exceptions
-        if char == '\\':
-            # Backslash exception
-            num1 = None
-            num2 = None
-            num3 = None
+    def ins_or_unchecked(self, var, symb1, symb2):
+        """
+        OR of the initialized bools
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = self.get_var(symb1).value or self.get_var(symb2).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-            # Load numbers
-            try:
-                num1 = source_string[index + 1]
-                num2 = source_string[index + 2]
-                num3 = source_string[index + 3]
-            except IndexError:
-                print_error_message(
-                    'Backslash at the end of the string',
-                    ERROR_WORKING_WITH_STRING,
-                    inspect.currentframe().f_lineno
-                )
+    def ins_not_unchecked(self, var, symb):
+        """
+        NOT of the initialized bool
+        """
+        var_dest = self.get_var(var)
+        var_dest.value = not self.get_var(symb).value
+        var_dest.type = Type.BOOLEAN
+        var_dest.is_init = True
 
-            # Checks if chars are numbers
-            if not is_char_number(num1) or not is_char_number(num2) or not is_char_number(num3):
-                print_error_message(
-                    'Char after backslash has to be number',
-                    ERROR_WORKING_WITH_STRING,
-                    inspect.currentframe().f_lineno
-                )
+    def ins_concat_unchecked(self, var, symb1, symb2):
+        """
+        Concatenation of the initialized strings
+        """
+        dest_var = self.get_var(var)
+        dest_var.value = self.get_var(symb1).value + self.get_var(symb2).value
+        dest_var.type = Type.STRING
+        dest_var.is_init = True
 
-            # Calculates the next three numbers after backslash
-            num = 100 * int(num1) + 10 * int(num2) + int(num3)
-            final += chr(num)
-            skip = 3
-        else:
-            final += char
+    def ins_strlen_unchecked(self, var, symb):
+        """
+        Length of the initialized string
+        """
+        var1 = self.get_var(var)
+        var1.value = len(self.get_var(symb).value)
+        var1.type = Type.INT
+        var1.is_init = True
 
-    return final
+    def ins_getchar_unchecked(self, var, symb1, symb2):
+        """
+        Gets one char of the initialized string at the initialized integer position
+        """
+        var_dest = self.get_var(var)
+        string = self.get_var(symb1).value
+        position = self.get_var(symb2).value
 
+        # Checks index validity
+        if len(string) <= position or position < 0:
+            print_error_message(
+                'Index outside string\nInstruction: GETCHAR',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
 
-def check_arguments(arguments):
-    """
+        var_dest.value = string[position]
+        var_dest.type = Type.STRING
+        var_dest.is_init = True
+
+    def ins_setchar_unchecked(self, var, symb1, symb2):
+        """
+        Modify the initialized string at the initialized integer position as new char of the initialized string
+        """
+        var_dest = self.get_var(var)
+        s = var_dest.value
+        pos = self.get_var(symb1).value
+        char = self.get_var(symb2).value[:1]
+
+        if pos >= len(s) or pos < 0 or len(char) < 1:
+            print_error_message(
+                'Bad index or char',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
+
+        var_dest.value = s[:pos] + char + s[pos+1:]
+
+    def ins_jumpifeq_unchecked(self, target, symb1, symb2):
+        """
+        Jumps to the label if the initialized variables of the same type are equal
+        """
+        if self.get_var(symb1).value == self.get_var(symb2).value:
+            self.jump(target)
+
+    def ins_jumpifneq_unchecked(self, target, symb1, symb2):
+        """
+        Jumps to the label if the initialized variables of the same type are not equal
+        """
+        if self.get_var(symb1).value != self.get_var(symb2).value:
+            self.jump(target)
+
+    def infer_types(self):
+        """
+        Infers the types of the global variables before every block of the instructions over the control flow graph,
+        the variable has known type if it's initialized by the same type on every path to the block
+        The returns lead to the instructions following every call
+        @return: Starts and ends of the blocks and the known types of the variables before them, None if unreachable
+        """
+        instructions = self.instructions
+        count = len(instructions)
+        return_sites = [index + 1 for index, ins in enumerate(instructions) if ins.opcode == 'CALL']
+
+        # The block starts at the beginning, after every jump and at every target of the jump
+        leaders = {0}
+        for index, ins in enumerate(instructions):
+            if ins.opcode in Program.jump_opcodes:
+                leaders.add(index + 1)
+                if ins.operands and type(ins.operands[0]) is int:
+                    leaders.add(ins.operands[0] + 1)
+        starts = sorted(leader for leader in leaders if leader < count)
+        ends = starts[1:] + [count] if starts else []
+        blocks = {start: block for block, start in enumerate(starts)}
+
+        # Successors of the blocks by their last instructions
+        successors = []
+        for end in ends:
+            ins = instructions[end - 1]
+            if ins.opcode == 'JUMP' or ins.opcode == 'CALL':
+                following = [ins.operands[0] + 1]
+            elif ins.opcode == 'RETURN':
+                following = return_sites
+            elif ins.opcode == 'EXIT':
+                following = []
+            elif ins.opcode in Program.jump_opcodes:
+                following = [end, ins.operands[0] + 1]
+            else:
+                following = [end]
+            successors.append([blocks[index] for index in following if index < count])
+
+        states = [None] * len(starts)
+        if starts:
+            states[0] = {}
+
+        # Cycles until the types before the blocks don't change
+        work = [0] if starts else []
+        while work:
+            block = work.pop()
+            state = dict(states[block])
+            for ins in instructions[starts[block]:ends[block]]:
+                update_types(ins, state)
+
+            for successor in successors[block]:
+                if states[successor] is None:
+                    states[successor] = dict(state)
+                    work.append(successor)
+                    continue
+
+                # Only the types which are the same on both paths are known
+                merged = {var: var_type for var, var_type in states[successor].items() if state.get(var) is var_type}
+                if len(merged) != len(states[successor]):
+                    states[successor] = merged
+                    work.append(successor)
+
+        return starts, ends, states
+
+    def specialize_instructions(self):
+        """
+        Replaces the functions of the instructions whose operands are initialized and have the known types
+        by the functions without the checks of the initialization and the types
+        """
+        for start, end, state in zip(*self.infer_types()):
+            # The unreachable instructions are not changed
+            if state is None:
+                continue
+
+            for ins in self.instructions[start:end]:
+                operands_kinds = Program.operands_kinds[ins.opcode]
+
+                # SETCHAR reads its destination variable too
+                if ins.opcode == 'SETCHAR':
+                    read_operands = ins.operands
+                else:
+                    read_operands = [operand for operand, kind in zip(ins.operands, operands_kinds) if kind == 'symb']
+
+                key = (ins.opcode,) + tuple(get_operand_type(operand, state) for operand in read_operands)
+                function = Program.unchecked_functions.get(key)
+                if function is not None:
+                    ins.function = function
+
+                update_types(ins, state)
+
+    # endregion
+
+    # region Superinstructions
+
+    def ins_pushs_pushs_operation(self, symb1, symb2, operation, op, result_type):
+        """
+        PUSHS, PUSHS and the binary stack instruction, the operands are not pushed on the stack
+        @param operation: Function of the stack instruction
+        @param op: Operator of the stack instruction
+        @param result_type: Type of the result of the stack instruction
+        """
+        var1 = self.get_var(symb1)
+        var1.init_control()
+        var2 = self.get_var(symb2)
+        var2.init_control()
+
+        self.stack.push(result_type, operation(var1.type, var1.value, var2.type, var2.value, op))
+        self.iteration += 2
+
+    def ins_defvar_move(self, var, symb):
+        """
+        DEFVAR and MOVE to the defined variable
+        """
+        frame, name = var
+        dest_var = Variable(name)
+        self.get_frame(frame).add(dest_var)
+
+        symb_var = self.get_var(symb)
+        symb_var.init_control()
+
+        dest_var.is_init = True
+        dest_var.type = symb_var.type
+        dest_var.value = symb_var.value
+        self.iteration += 1
+
+    def ins_math_jumpif(self, var, symb1, symb2, op, target, symb3, symb4, comparison):
+        """
+        ADD or SUB and the conditional jump comparing its result, e.g. the end of the counted loop
+        @param op: Operator of the mathematical instruction
+        @param comparison: Operator of the comparison of the jump
+        """
+        destination = self.get_var(var)
+        math_operation(destination, self.get_var(symb1), self.get_var(symb2), op)
+        self.iteration += 1
+
+        if vars_compare(self.get_var(symb3), self.get_var(symb4), comparison):
+            self.jump(target)
+
+    def ins_compare_jumpif(self, var, symb1, symb2, op, target, value):
+        """
+        LT, GT or EQ and the conditional jump comparing its result with the bool constant
+        @param op: Operator of the comparison instruction
+        @param value: Result of the comparison instruction which jumps
+        """
+        var_dest = self.get_var(var)
+        lt_gt_eq(var_dest, self.get_var(symb1), self.get_var(symb2), op)
+        self.iteration += 1
+
+        if var_dest.value is value:
+            self.jump(target)
+
+    def match_fusion(self, index: int):
+        """
+        Finds the sequence of the instructions starting at the index which can be fused,
+        the sequence doesn't contain labels and calls, so no jump continues in the middle of it
+        @param index: Iteration of the first instruction of the sequence
+        @return: Number of the fused instructions, function and operands of the superinstruction or None
+        """
+        first, *following = self.instructions[index:index + 3]
+
+        if not following:
+            return None
+
+        second = following[0]
+
+        # PUSHS a; PUSHS b; ADDS
+        if len(following) == 2 and first.opcode == 'PUSHS' and second.opcode == 'PUSHS':
+            stack_operation = Program.fused_stack_operations.get(following[1].opcode)
+            if stack_operation is not None:
+                operands = (first.operands[0], second.operands[0]) + stack_operation
+                return 3, Program.ins_pushs_pushs_operation, operands
+
+        # DEFVAR x; MOVE x c
+        if first.opcode == 'DEFVAR' and second.opcode == 'MOVE' and first.operands[0] == second.operands[0]:
+            return 2, Program.ins_defvar_move, second.operands
+
+        if second.opcode != 'JUMPIFEQ' and second.opcode != 'JUMPIFNEQ':
+            return None
+
+        target, symb1, symb2 = second.operands
+        var = first.operands[0] if first.operands else None
+
+        # ADD i i int@1; JUMPIFNEQ L i int@N
+        if first.opcode in Program.fused_math_operators and (symb1 == var or symb2 == var):
+            comparison = '==' if second.opcode == 'JUMPIFEQ' else '!='
+            operands = first.operands + (Program.fused_math_operators[first.opcode], target, symb1, symb2, comparison)
+            return 2, Program.ins_math_jumpif, operands
+
+        # LT tmp a b; JUMPIFEQ L tmp bool@true
+        if first.opcode in Program.fused_comparison_operators:
+            constant = symb2 if symb1 == var else symb1 if symb2 == var else None
+            if type(constant) is Variable and constant.type is Type.BOOLEAN:
+                value = constant.value is (second.opcode == 'JUMPIFEQ')
+                operands = first.operands + (Program.fused_comparison_operators[first.opcode], target, value)
+                return 2, Program.ins_compare_jumpif, operands
+
+        return None
+
+    def fuse_instructions(self, show_fusions: bool):
+        """
+        Fuses the common sequences of the instructions into the superinstructions,
+        the superinstruction replaces the function of the first instruction of the sequence
+        and moves the iteration to the last one, so the rest of the sequence is skipped
+        @param show_fusions: Prints the fused sequences to the stderr
+        """
+        index = 0
+        while index < len(self.instructions):
+            fusion = self.match_fusion(index)
+            if fusion is None:
+                index += 1
+                continue
+
+            length, function, operands = fusion
+            ins = self.instructions[index]
+            ins.function = function
+            ins.operands = operands
+
+            if show_fusions:
+                opcodes = [fused.opcode for fused in self.instructions[index:index + length]]
+                sys.stderr.write('Fusion at order ' + str(ins.order) + ': ' + ' '.join(opcodes) + '\n')
+
+            index += length
+
+    # endregion
+
+    # region Closure engine
+
+    def compile_getter(self, operand):
+        """
+        Compiles the operand into the function which returns its variable without the checks of the frames,
+        the missing frame or variable is returned as None, so the generic function reports the error
+        @param operand: Pair of the frame and the name of the variable or constant variable
+        @return: Function without arguments which returns the variable or None
+        """
+        # The constant is returned by the iterator, so its getter is not the Python function
+        if type(operand) is not tuple:
+            return itertools.repeat(operand).__next__
+
+        frame, name = operand
+        frames = self.frames
+
+        # The global frame and the list of the local frames are never replaced, the temporary frame is
+        if frame == 'GF':
+            return functools.partial(frames.global_frame.variables.get, name)
+
+        if frame == 'LF':
+            local_frames = frames.local_frames
+
+            def get_local():
+                return local_frames[-1].variables.get(name) if local_frames else None
+
+            return get_local
+
+        def get_temporary():
+            temporary_frame = frames.temporary_frame
+            return temporary_frame.variables.get(name) if temporary_frame is not None else None
+
+        return get_temporary
+
+    def compile_operation(self, ins: Instruction):
+        """
+        Compiles the binary instruction from the table closure_operations, the fast path is taken
+        if all variables exist and the operands have the same allowed type, otherwise the generic function is called
+        @param ins: The instruction
+        @return: Closure of the instruction
+        """
+        operation, operand_types, result_type = Program.closure_operations[ins.opcode]
+        get_destination, get_operand1, get_operand2 = [self.compile_getter(operand) for operand in ins.operands]
+        generic = functools.partial(ins.function, self, *ins.operands)
+
+        def step():
+            destination = get_destination()
+            var1 = get_operand1()
+            var2 = get_operand2()
+
+            if destination is None or var1 is None or var2 is None \
+                    or var1.type is not var2.type or var1.type not in operand_types:
+                generic()
+                return
+
+            destination.value = operation(var1.value, var2.value)
+            destination.type = result_type
+            destination.is_init = True
+
+        return step
+
+    def compile_move(self, ins: Instruction):
+        """
+        Compiles MOVE of the initialized variable
+        @param ins: The instruction
+        @return: Closure of the instruction
+        """
+        get_destination, get_source = [self.compile_getter(operand) for operand in ins.operands]
+        generic = functools.partial(ins.function, self, *ins.operands)
+
+        def step():
+            destination = get_destination()
+            source = get_source()
+
+            if destination is None or source is None or not source.is_init:
+                generic()
+                return
+
+            destination.type = source.type
+            destination.value = source.value
+            destination.is_init = True
+
+        return step
+
+    def compile_write(self, ins: Instruction):
+        """
+        Compiles WRITE of the initialized variable
+        @param ins: The instruction
+        @return: Closure of the instruction
+        """
+        get_source = self.compile_getter(ins.operands[0])
+        write = self.output.write
+        generic = functools.partial(ins.function, self, *ins.operands)
+
+        def step():
+            source = get_source()
+
+            if source is None or not source.is_init:
+                generic()
+            elif source.type is Type.STRING:
+                write(source.value)
+            elif source.type is Type.INT:
+                write(str(source.value))
+            elif source.type is Type.BOOLEAN:
+                write('true' if source.value else 'false')
+
+        return step
+
+    def compile_jumpif(self, ins: Instruction):
+        """
+        Compiles JUMPIFEQ or JUMPIFNEQ with the bound target
+        @param ins: The instruction
+        @return: Closure of the instruction
+        """
+        target, symb1, symb2 = ins.operands
+        get_operand1 = self.compile_getter(symb1)
+        get_operand2 = self.compile_getter(symb2)
+        jump_if_equal = ins.opcode == 'JUMPIFEQ'
+        comparable_types = Program.closure_comparable_types
+        jump = self.jump
+        generic = functools.partial(ins.function, self, *ins.operands)
+
+        def step():
+            var1 = get_operand1()
+            var2 = get_operand2()
+
+            if var1 is None or var2 is None or var1.type is not var2.type or var1.type not in comparable_types:
+                generic()
+            elif (var1.value == var2.value) is jump_if_equal:
+                jump(target)
+
+        return step
+
+    def compile_closures(self) -> list:
+        """
+        Compiles every instruction into the closure with its operands, frames and jump target already bound,
+        the instructions without the compiler and the specialized or fused instructions call their functions
+        @return: Closures of the instructions by their iterations
+        """
+        closures = []
+
+        for ins in self.instructions:
+            compiler = Program.closure_compilers.get(ins.opcode)
+
+            if ins.opcode == 'LABEL':
+                closures.append(lambda: None)
+            elif ins.opcode == 'JUMP':
+                closures.append(functools.partial(self.jump, ins.operands[0]))
+            elif compiler is not None and ins.function is Program.functions[ins.opcode]:
+                closures.append(compiler(self, ins))
+            else:
+                closures.append(functools.partial(ins.function, self, *ins.operands))
+
+        return closures
+
+    def run_closures(self):
+        """
+        The interpretation of the program by the closures of the instructions
+        """
+        closures = self.compile_closures()
+        number_of_instructions = len(closures)
+
+        while self.iteration < number_of_instructions:
+            closures[self.iteration]()
+            self.iteration += 1
+
+    # endregion
+
+    # region Python engine
+
+    def run_step(self, iteration: int) -> int:
+        """
+        Proceeds one instruction by its function, the generated code calls it for the instructions without
+        the fast path and when the fast path can't be taken, so the errors are the same as without the engine
+        @param iteration: Iteration of the instruction
+        @return: The next iteration
+        """
+        self.iteration = iteration
+        ins = self.instructions[iteration]
+        ins.function(self, *ins.operands)
+
+        return self.iteration + 1
+
+    def python_namespace(self) -> dict:
+        """
+        @return: Global variables of the generated code
+        """
+        namespace = {
+            'program': self,
+            'frames': self.frames,
+            'local_frames': self.frames.local_frames,
+            'gf_get': self.frames.global_frame.variables.get,
+            'jump': self.jump,
+            'step': self.run_step,
+            'output_write': self.output.write,
+            'stack': self.stack,
+            'stack_push': self.stack.push,
+        }
+        for var_type in Type:
+            namespace['TYPE_' + var_type.name] = var_type
+
+        return namespace
+
+    def run_python(self, code):
+        """
+        The interpretation of the program by the code generated by generate_python, the functions of the blocks
+        return the next iteration and the iterations inside the blocks are proceeded one by one
+        @param code: Compiled code of the generated module
+        """
+        namespace = self.python_namespace()
+        exec(code, namespace)
+
+        number_of_instructions = len(self.instructions)
+        blocks = [
+            namespace.get('block_' + str(iteration)) or functools.partial(self.run_step, iteration)
+            for iteration in range(number_of_instructions)
+        ]
+
+        iteration = self.iteration
+        while iteration < number_of_instructions:
+            iteration = blocks[iteration]()
+        self.iteration = iteration
+
+    # endregion
+
+    # region Tracing JIT
+
+    def record_trace(self, head: int):
+        """
+        Proceeds the loop from its label and records the iterations of the proceeded instructions
+        with the types of their operands until the loop jumps back to the label
+        @param head: Iteration of the label of the loop
+        @return: Recorded pairs of the iteration and the types of the operands, or None if the loop is too long
+                 or the program ends, the iteration is the last proceeded instruction
+        """
+        path = []
+        number_of_instructions = len(self.instructions)
+        find_variable = self.frames.find_variable
+
+        while len(path) < JIT_MAX_TRACE_LENGTH:
+            iteration = self.iteration + 1
+            if iteration >= number_of_instructions:
+                return None
+
+            ins = self.instructions[iteration]
+
+            # The types are recorded before the instruction changes them, None is the missing variable
+            types = []
+            for operand in ins.operands:
+                if type(operand) is tuple:
+                    var = find_variable(operand[0], operand[1])
+                    types.append(None if var is None else var.type)
+                elif type(operand) is Variable:
+                    types.append(operand.type)
+                else:
+                    types.append(None)
+            path.append((iteration, tuple(types)))
+
+            self.iteration = iteration
+            ins.function(self, *ins.operands)
+
+            if self.iteration == head:
+                return path
+
+        return None
+
+    def run_jit(self):
+        """
+        The interpretation of the program which counts the jumps back to the labels, the loop whose label
+        is reached JIT_THRESHOLD times is recorded by record_trace and compiled by transpile_trace into the function,
+        which is called instead of the interpretation of the loop until its guards fail too often
+        """
+        steps = [(ins.function, ins.operands) for ins in self.instructions]
+        number_of_instructions = len(steps)
+        labels = set(iteration for iteration, ins in enumerate(self.instructions) if ins.opcode == 'LABEL')
+        counts = {}  # Numbers of the jumps back to the labels
+        traces = {}  # Compiled traces by the labels of the loops, False for the loops which can't be traced
+        failures = {}  # Numbers of the failed guards of the traces
+        namespace = self.python_namespace()
+
+        def guard_failed(head, iteration):
+            # The trace with the changed types is recorded again
+            failures[head] += 1
+            if failures[head] > JIT_THRESHOLD:
+                del traces[head]
+                counts[head] = 0
+
+            return self.run_step(iteration)
+
+        namespace['guard_failed'] = guard_failed
+
+        while self.iteration < number_of_instructions:
+            iteration = self.iteration
+            function, operands = steps[iteration]
+            function(self, *operands)
+
+            # The jump back to the label of the loop
+            if self.iteration < iteration and self.iteration in labels:
+                head = self.iteration
+                trace = traces.get(head)
+
+                if trace:
+                    self.iteration = trace() - 1
+                elif trace is None:
+                    counts[head] = counts.get(head, 0) + 1
+
+                    if counts[head] >= JIT_THRESHOLD:
+                        path = self.record_trace(head)
+
+                        if path is None:
+                            traces[head] = False
+                        else:
+                            exec(compile(transpile_trace(self, head, path), '<trace>', 'exec'), namespace)
+                            traces[head] = namespace['trace_' + str(head)]
+                            failures[head] = 0
+
+            self.iteration += 1
+
+    # endregion
+
+    # region Instructions tables
+
+    # Functions of the instructions by their opcodes
+    functions = {
+        'MOVE': ins_move,
+        'CREATEFRAME': ins_createframe,
+        'PUSHFRAME': ins_pushframe,
+        'POPFRAME': ins_popframe,
+        'DEFVAR': ins_defvar,
+        'CALL': ins_call,
+        'RETURN': ins_return,
+        'PUSHS': ins_pushs,
+        'POPS': ins_pops,
+        'ADD': ins_add,
+        'SUB': ins_sub,
+        'MUL': ins_mul,
+        'IDIV': ins_idiv,
+        'LT': ins_lt,
+        'GT': ins_gt,
+        'EQ': ins_eq,
+        'AND': ins_and,
+        'OR': ins_or,
+        'NOT': ins_not,
+        'INT2CHAR': ins_int2char,
+        'STRI2INT': ins_stri2int,
+        'READ': ins_read,
+        'WRITE': ins_write,
+        'CONCAT': ins_concat,
+        'STRLEN': ins_strlen,
+        'GETCHAR': ins_getchar,
+        'SETCHAR': ins_setchar,
+        'TYPE': ins_type,
+        'LABEL': ins_label,
+        'JUMP': ins_jump,
+        'JUMPIFEQ': ins_jumpifeq,
+        'JUMPIFNEQ': ins_jumpifneq,
+        'EXIT': ins_exit,
+        'DPRINT': ins_dprint,
+        'BREAK': ins_break,
+        'CLEARS': ins_clears,
+        'ADDS': ins_adds,
+        'SUBS': ins_subs,
+        'MULS': ins_muls,
+        'IDIVS': ins_idivs,
+        'LTS': ins_lts,
+        'GTS': ins_gts,
+        'EQS': ins_eqs,
+        'ANDS': ins_ands,
+        'ORS': ins_ors,
+        'NOTS': ins_nots,
+        'INT2CHARS': ins_int2chars,
+        'STRI2INTS': ins_stri2ints,
+        'JUMPIFEQS': ins_jumpifeqs,
+        'JUMPIFNEQS': ins_jumpifneqs,
+    }
+
+    # Kinds of the operands of the instructions by their opcodes
+    operands_kinds = {
+        'MOVE': ('var', 'symb'),
+        'CREATEFRAME': (),
+        'PUSHFRAME': (),
+        'POPFRAME': (),
+        'DEFVAR': ('var',),
+        'CALL': ('label',),
+        'RETURN': (),
+        'PUSHS': ('symb',),
+        'POPS': ('var',),
+        'ADD': ('var', 'symb', 'symb'),
+        'SUB': ('var', 'symb', 'symb'),
+        'MUL': ('var', 'symb', 'symb'),
+        'IDIV': ('var', 'symb', 'symb'),
+        'LT': ('var', 'symb', 'symb'),
+        'GT': ('var', 'symb', 'symb'),
+        'EQ': ('var', 'symb', 'symb'),
+        'AND': ('var', 'symb', 'symb'),
+        'OR': ('var', 'symb', 'symb'),
+        'NOT': ('var', 'symb'),
+        'INT2CHAR': ('var', 'symb'),
+        'STRI2INT': ('var', 'symb', 'symb'),
+        'READ': ('var', 'type'),
+        'WRITE': ('symb',),
+        'CONCAT': ('var', 'symb', 'symb'),
+        'STRLEN': ('var', 'symb'),
+        'GETCHAR': ('var', 'symb', 'symb'),
+        'SETCHAR': ('var', 'symb', 'symb'),
+        'TYPE': ('var', 'symb'),
+        'LABEL': ('label',),
+        'JUMP': ('label',),
+        'JUMPIFEQ': ('label', 'symb', 'symb'),
+        'JUMPIFNEQ': ('label', 'symb', 'symb'),
+        'EXIT': ('symb',),
+        'DPRINT': ('symb',),
+        'BREAK': (),
+        'CLEARS': (),
+        'ADDS': (),
+        'SUBS': (),
+        'MULS': (),
+        'IDIVS': (),
+        'LTS': (),
+        'GTS': (),
+        'EQS': (),
+        'ANDS': (),
+        'ORS': (),
+        'NOTS': (),
+        'INT2CHARS': (),
+        'STRI2INTS': (),
+        'JUMPIFEQS': ('label',),
+        'JUMPIFNEQS': ('label',),
+    }
+
+    # Instructions which can continue by jump
+    jump_opcodes = ('JUMP', 'CALL', 'RETURN', 'EXIT', 'JUMPIFEQ', 'JUMPIFNEQ', 'JUMPIFEQS', 'JUMPIFNEQS')
+
+    # Types of the destination variables after the instructions
+    result_types = {
+        'ADD': Type.INT,
+        'SUB': Type.INT,
+        'MUL': Type.INT,
+        'IDIV': Type.INT,
+        'STRLEN': Type.INT,
+        'STRI2INT': Type.INT,
+        'LT': Type.BOOLEAN,
+        'GT': Type.BOOLEAN,
+        'EQ': Type.BOOLEAN,
+        'AND': Type.BOOLEAN,
+        'OR': Type.BOOLEAN,
+        'NOT': Type.BOOLEAN,
+        'INT2CHAR': Type.STRING,
+        'CONCAT': Type.STRING,
+        'GETCHAR': Type.STRING,
+        'SETCHAR': Type.STRING,
+        'TYPE': Type.STRING,
+    }
+
+    # Functions of the instructions without the checks of the initialization and the types of their operands,
+    # by their opcodes and the types of the read operands
+    unchecked_functions = {
+        ('ADD', Type.INT, Type.INT): ins_add_unchecked,
+        ('SUB', Type.INT, Type.INT): ins_sub_unchecked,
+        ('MUL', Type.INT, Type.INT): ins_mul_unchecked,
+        ('IDIV', Type.INT, Type.INT): ins_idiv_unchecked,
+        ('LT', Type.INT, Type.INT): ins_lt_unchecked,
+        ('LT', Type.STRING, Type.STRING): ins_lt_unchecked,
+        ('LT', Type.BOOLEAN, Type.BOOLEAN): ins_lt_unchecked,
+        ('GT', Type.INT, Type.INT): ins_gt_unchecked,
+        ('GT', Type.STRING, Type.STRING): ins_gt_unchecked,
+        ('GT', Type.BOOLEAN, Type.BOOLEAN): ins_gt_unchecked,
+        ('EQ', Type.INT, Type.INT): ins_eq_unchecked,
+        ('EQ', Type.STRING, Type.STRING): ins_eq_unchecked,
+        ('EQ', Type.BOOLEAN, Type.BOOLEAN): ins_eq_unchecked,
+        ('EQ', Type.NULL, Type.NULL): ins_eq_unchecked,
+        ('AND', Type.BOOLEAN, Type.BOOLEAN): ins_and_unchecked,
+        ('OR', Type.BOOLEAN, Type.BOOLEAN): ins_or_unchecked,
+        ('NOT', Type.BOOLEAN): ins_not_unchecked,
+        ('CONCAT', Type.STRING, Type.STRING): ins_concat_unchecked,
+        ('STRLEN', Type.STRING): ins_strlen_unchecked,
+        ('GETCHAR', Type.STRING, Type.INT): ins_getchar_unchecked,
+        ('SETCHAR', Type.STRING, Type.INT, Type.STRING): ins_setchar_unchecked,
+        ('JUMPIFEQ', Type.INT, Type.INT): ins_jumpifeq_unchecked,
+        ('JUMPIFEQ', Type.STRING, Type.STRING): ins_jumpifeq_unchecked,
+        ('JUMPIFEQ', Type.BOOLEAN, Type.BOOLEAN): ins_jumpifeq_unchecked,
+        ('JUMPIFEQ', Type.NULL, Type.NULL): ins_jumpifeq_unchecked,
+        ('JUMPIFNEQ', Type.INT, Type.INT): ins_jumpifneq_unchecked,
+        ('JUMPIFNEQ', Type.STRING, Type.STRING): ins_jumpifneq_unchecked,
+        ('JUMPIFNEQ', Type.BOOLEAN, Type.BOOLEAN): ins_jumpifneq_unchecked,
+        ('JUMPIFNEQ', Type.NULL, Type.NULL): ins_jumpifneq_unchecked,
+    }
+
+    # Engines of the interpretation selected by parameter --engine
+    engines = ('default', 'closure', 'python', 'jit')
+
+    # Instructions which change the frames, the variables of the frames are not known after them
+    frame_opcodes = ('CREATEFRAME', 'PUSHFRAME', 'POPFRAME')
+
+    # Instructions after which the following instruction can be reached by jump or return
+    block_end_opcodes = ('JUMP', 'CALL', 'RETURN', 'EXIT')
+
+    # Instructions which can be folded if their operands are constants
+    folded_opcodes = (
+        'ADD', 'SUB', 'MUL', 'IDIV', 'LT', 'GT', 'EQ', 'AND', 'OR', 'NOT',
+        'INT2CHAR', 'STRI2INT', 'CONCAT', 'STRLEN', 'GETCHAR', 'TYPE'
+    )
+
+    # Functions, operators and result types of the stack instructions fused with the preceding PUSHS instructions
+    fused_stack_operations = {
+        'ADDS': (stack_math, '+', Type.INT),
+        'SUBS': (stack_math, '-', Type.INT),
+        'MULS': (stack_math, '*', Type.INT),
+        'IDIVS': (stack_math, '//', Type.INT),
+        'LTS': (stack_compare, '<', Type.BOOLEAN),
+        'GTS': (stack_compare, '>', Type.BOOLEAN),
+        'EQS': (stack_compare, '==', Type.BOOLEAN),
+        'ANDS': (stack_logic, 'and', Type.BOOLEAN),
+        'ORS': (stack_logic, 'or', Type.BOOLEAN),
+    }
+
+    # Operators of the instructions fused with the following conditional jump
+    fused_math_operators = {
+        'ADD': '+',
+        'SUB': '-',
+    }
+    fused_comparison_operators = {
+        'LT': '<',
+        'GT': '>',
+        'EQ': '==',
+    }
+
+    # Operations, allowed types of the operands and result types of the instructions compiled by compile_operation
+    closure_operations = {
+        'ADD': (operator.add, (Type.INT,), Type.INT),
+        'SUB': (operator.sub, (Type.INT,), Type.INT),
+        'MUL': (operator.mul, (Type.INT,), Type.INT),
+        'LT': (operator.lt, (Type.INT, Type.STRING, Type.BOOLEAN), Type.BOOLEAN),
+        'GT': (operator.gt, (Type.INT, Type.STRING, Type.BOOLEAN), Type.BOOLEAN),
+        'EQ': (operator.eq, (Type.INT, Type.STRING, Type.BOOLEAN, Type.NULL), Type.BOOLEAN),
+        'AND': (operator.and_, (Type.BOOLEAN,), Type.BOOLEAN),
+        'OR': (operator.or_, (Type.BOOLEAN,), Type.BOOLEAN),
+        'CONCAT': (operator.add, (Type.STRING,), Type.STRING),
+    }
+
+    # Operators of the instructions of closure_operations in the code generated by generate_python
+    python_operators = {
+        'ADD': '+',
+        'SUB': '-',
+        'MUL': '*',
+        'LT': '<',
+        'GT': '>',
+        'EQ': '==',
+        'AND': 'and',
+        'OR': 'or',
+        'CONCAT': '+',
+    }
+
+    # Jumps with the fast path in the code generated by generate_python
+    python_jump_opcodes = ('JUMP', 'JUMPIFEQ', 'JUMPIFNEQ')
+
+    # Types compared by the closures of the conditional jumps
+    closure_comparable_types = (Type.INT, Type.STRING, Type.BOOLEAN, Type.NULL)
+
+    # Compilers of the closures by the opcodes
+    closure_compilers = {
+        'MOVE': compile_move,
+        'WRITE': compile_write,
+        'JUMPIFEQ': compile_jumpif,
+        'JUMPIFNEQ': compile_jumpif,
+        'ADD': compile_operation,
+        'SUB': compile_operation,
+        'MUL': compile_operation,
+        'LT': compile_operation,
+        'GT': compile_operation,
+        'EQ': compile_operation,
+        'AND': compile_operation,
+        'OR': compile_operation,
+        'CONCAT': compile_operation,
+    }
+
+    # endregion
+
+
+def is_char_number(num: str) -> bool:
+    """
+    @param num: Number in string format
+    @return: If char is number
+    """
+    return '0' <= num <= '9'
+
+
+def translate_to_normal_string(source_string: str):
+    """
+    Translates IPPcode22 string to the normal string
+    The string is split by backslashes, and every part starts with the escape sequence,
+    so the string is translated in one pass
+    @param source_string: Source string which will be translated
+    @return: Translated string
+    """
+    # Most of the strings don't contain any escape sequence
+    if '\\' not in source_string:
+        return source_string
+
+    parts = source_string.split('\\')
+
+    # Final parts of the string which will be joined
+    final = [parts[0]]
+
+    for part in parts[1:]:
+        # Checks if the three chars after backslash are numbers
+        if len(part) < 3:
+            print_error_message(
+                'Backslash at the end of the string',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
+
+        if not is_char_number(part[0]) or not is_char_number(part[1]) or not is_char_number(part[2]):
+            print_error_message(
+                'Char after backslash has to be number',
+                ERROR_WORKING_WITH_STRING,
+                inspect.currentframe().f_lineno
+            )
+
+        # Calculates the next three numbers after backslash
+        final.append(chr(int(part[0:3])))
+        final.append(part[3:])
+
+    return ''.join(final)
+
+
+class Options:
+    """
+    The options of the program set by its parameters
+    """
+
+    def __init__(self):
+        self.cache_dir = None  # Directory of the cache of the loaded programs
+        self.cache_size = DEFAULT_CACHE_SIZE
+        self.output_buffer_size = DEFAULT_OUTPUT_BUFFER_SIZE
+        self.interleave = False  # Flush the output before writing to the stderr
+        self.optimize = False  # Fuse the common sequences of the instructions
+        self.show_fusions = False  # Print the fused sequences to the stderr
+        self.profile = None  # Prefix of the files of the profile report
+        self.trace_size = None  # Number of the instructions remembered by the trace
+        self.trace_file = None  # File of the dump of the trace, the stderr if it's not set
+        self.batch = None  # Directory or glob pattern of the input files of the batch
+        self.batch_output = None  # Directory of the results of the batch, JSON lines on the stdout if it's not set
+        self.jobs = None  # Number of the workers of the batch, the number of the processors if it's not set
+        self.engine = 'default'  # Engine of the interpretation
+
+
+def parse_number(arg: str, prefix_length: int) -> int:
+    """
+    Parses the positive number of the parameter
+    @param arg: The parameter
+    @param prefix_length: Length of the name of the parameter with '='
+    @return: The number
+    """
+    try:
+        number = int(arg[prefix_length:])
+    except ValueError:
+        number = 0
+
+    if number <= 0:
+        print_error_message(
+            'Invalid number: ' + arg,
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    return number
+
+
+def check_arguments(arguments):
+    """
 	The program checks each argument and its forbidden combination, then prints error message
 	and exits the program with the appropriate exit code
 	@param arguments: List of arguments
-	@return: Source file, Input lines
+	@return: Source file, Input reader, Options
 	"""
     # The initialization of source and input file
     source_file = None
     input_file = None
+    options = Options()
+
+    # Cycle through arguments
+    for arg in arguments:
+        if arg == '--help':
+            # Help argument
+            if len(sys.argv) != 1:
+                print_error_message(
+                    '--help param can\'t be used with other parameters',
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+            else:
+                print_help_message()
+        elif arg[0:9] == '--source=':
+            # Source file argument
+            source_file = arg[9:]
+        elif arg[0:8] == '--input=':
+            # Input file argument
+            input_file = arg[8:]
+        elif arg[0:8] == '--cache=':
+            # Cache directory argument
+            options.cache_dir = arg[8:]
+        elif arg[0:13] == '--cache-size=':
+            # Cache size argument
+            try:
+                options.cache_size = int(arg[13:])
+            except ValueError:
+                print_error_message(
+                    'Invalid cache size: ' + arg[13:],
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        elif arg[0:16] == '--output-buffer=':
+            # Output buffer size argument
+            try:
+                options.output_buffer_size = int(arg[16:])
+            except ValueError:
+                print_error_message(
+                    'Invalid output buffer size: ' + arg[16:],
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        elif arg == '--interleave':
+            # Interleave output argument
+            options.interleave = True
+        elif arg[0:10] == '--profile=':
+            # Profile argument
+            options.profile = arg[10:]
+        elif arg[0:8] == '--trace=':
+            # Trace size argument
+            try:
+                options.trace_size = int(arg[8:])
+            except ValueError:
+                options.trace_size = 0
+
+            if options.trace_size <= 0:
+                print_error_message(
+                    'Invalid trace size: ' + arg[8:],
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        elif arg[0:13] == '--trace-file=':
+            # Trace file argument
+            options.trace_file = arg[13:]
+        elif arg == '--optimize':
+            # Optimization argument
+            options.optimize = True
+        elif arg == '--show-fusions':
+            # Printing of the fusions argument, the fusions are shown only if they are made
+            options.optimize = True
+            options.show_fusions = True
+        elif arg[0:9] == '--engine=':
+            # Engine argument
+            options.engine = arg[9:]
+
+            if options.engine not in Program.engines:
+                print_error_message(
+                    'Unknown engine: ' + options.engine,
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        elif arg[0:8] == '--batch=':
+            # Batch inputs argument
+            options.batch = arg[8:]
+        elif arg[0:15] == '--batch-output=':
+            # Batch results directory argument
+            options.batch_output = arg[15:]
+        elif arg[0:7] == '--jobs=':
+            # Batch workers argument
+            try:
+                options.jobs = int(arg[7:])
+            except ValueError:
+                options.jobs = 0
+
+            if options.jobs <= 0:
+                print_error_message(
+                    'Invalid number of jobs: ' + arg[7:],
+                    ERROR_INVALID_PARAMS_COMBINATION,
+                    inspect.currentframe().f_lineno
+                )
+        else:
+            print_error_message(
+                'Unknown parameter: ' + arg,
+                ERROR_INVALID_PARAMS_COMBINATION,
+                inspect.currentframe().f_lineno
+            )
+
+    # The profile and the trace use their own loops of the interpretation
+    if options.trace_size is not None and options.profile is not None:
+        print_error_message(
+            '--trace param can\'t be used with --profile param',
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    if options.trace_file is not None and options.trace_size is None:
+        print_error_message(
+            '--trace-file param can\'t be used without --trace param',
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    # The batch reads its own input files and interprets the program by the plain loop
+    if options.batch is not None and (input_file is not None or options.profile is not None
+                                      or options.trace_size is not None):
+        print_error_message(
+            '--batch param can\'t be used with --input, --profile or --trace params',
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    if options.engine != 'default' and (options.profile is not None or options.trace_size is not None):
+        print_error_message(
+            '--engine param can\'t be used with --profile or --trace params',
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    if options.batch is None and (options.batch_output is not None or options.jobs is not None):
+        print_error_message(
+            '--batch-output and --jobs params can\'t be used without --batch param',
+            ERROR_INVALID_PARAMS_COMBINATION,
+            inspect.currentframe().f_lineno
+        )
+
+    if source_file is None:
+        source_file = sys.stdin
+
+    return source_file, open_input(input_file), options
+
+
+def open_input(input_file) -> InputReader:
+    """
+    Opens the input file for the READ instruction, the regular file is mapped into the memory,
+    the standard input and pipes are read as streams
+    @param input_file: Name of the input file or None for the standard input
+    @return: Reader of the input lines
+    """
+    if input_file is None:
+        return InputReader(sys.stdin.buffer)
+
+    try:
+        f = open(input_file, 'rb')
+    except OSError:
+        print_error_message(
+            'Input file can\'t be opened\nFile name: ' + input_file,
+            ERROR_OPEN_INPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+
+    try:
+        stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        f.close()
+    except (ValueError, OSError):
+        # Empty files and pipes can't be mapped
+        stream = f
+
+    return InputReader(stream)
+
+
+def decode_operand(argument: Argument, kind: str, decoded_operands: dict):
+    """
+    The function decodes the argument into the operand of the instruction
+    Variables and literals are decoded only once, all their operands share the decoded one
+    @param argument: The argument for decode
+    @param kind: Kind of the operand, one of 'var', 'symb', 'label', 'type'
+    @param decoded_operands: Already decoded variables and literals by their types and values
+    @return: Pair of the frame and the name for variable, constant variable for literal, name for label and type
+    """
+    # Label and type are stored as their names
+    if kind == 'label' or kind == 'type':
+        if argument.type != kind:
+            print_error_message(
+                'Unexpected argument type, expected: ' + kind,
+                ERROR_XML_UNEXPECTED_STRUCTURE,
+                inspect.currentframe().f_lineno
+            )
 
-    # Cycle through arguments
-    for arg in arguments:
-        if arg == '--help':
-            # Help argument
-            if len(sys.argv) != 1:
-                print_error_message(
-                    '--help param can\'t be used with other parameters',
-                    ERROR_INVALID_PARAMS_COMBINATION,
-                    inspect.currentframe().f_lineno
-                )
-            else:
-                print_help_message()
-        elif arg[0:9] == '--source=':
-            # Source file argument
-            source_file = arg[9:]
-        elif arg[0:8] == '--input=':
-            # Input file argument
-            input_file = arg[8:]
-        else:
+        if kind == 'type' and argument.value not in ('int', 'string', 'bool'):
             print_error_message(
-                'Unknown parameter: ' + arg,
-                ERROR_INVALID_PARAMS_COMBINATION,
+                'Unknown type: ' + argument.value,
+                ERROR_XML_UNEXPECTED_STRUCTURE,
                 inspect.currentframe().f_lineno
             )
 
-    if source_file is None:
-        source_file = sys.stdin
+        return sys.intern(argument.value)
 
-    if input_file is None:
-        input_lines = sys.stdin
+    if kind == 'var' and argument.type != 'var':
+        print_error_message(
+            'Unexpected argument type, expected: var',
+            ERROR_XML_UNEXPECTED_STRUCTURE,
+            inspect.currentframe().f_lineno
+        )
+
+    key = (argument.type, argument.value)
+    if key in decoded_operands:
+        return decoded_operands[key]
+
+    # Variable is stored as the pair of the frame and the name
+    if argument.type == 'var':
+        frame = argument.value[0:2]
+        if frame != 'GF' and frame != 'LF' and frame != 'TF':
+            print_error_message(
+                'Unknown frame opcode: ' + frame,
+                ERROR_XML_UNEXPECTED_STRUCTURE,
+                inspect.currentframe().f_lineno
+            )
+
+        operand = sys.intern(frame), sys.intern(argument.value[3:])
+    elif argument.type == 'string':
+        # String literal is translated only here
+        operand = Variable(None, Type.STRING, translate_to_normal_string(argument.value))
     else:
-        f = open(input_file, 'r')
-        input_lines = f.read().splitlines()
+        # Literal is stored as the constant variable
+        operand = Variable(None, argument.type, argument.value)
+
+    decoded_operands[key] = operand
 
-    return source_file, input_lines
+    return operand
 
 
 def ins_check(instruct):
@@ -1891,14 +3778,11 @@ def arg_check(arg):
         )
 
 
-def load_xml(tree, program: Program):
+def root_check(root):
+    """
+    The function checks root's validity
+    @param root: The root for check
     """
-	The function gets xml file and iterates through it to get the instructions and their arguments
-	@param tree: tree of xml file
-	@param program:	The program class
-	"""
-    root = tree.getroot()
-
     if root.tag != 'program':
         print_error_message(
             'Unexpected element',
@@ -1907,66 +3791,133 @@ def load_xml(tree, program: Program):
         )
 
     # Checks root language
-    if root.attrib['language'] != 'IPPcode22':
+    if root.attrib.get('language') != 'IPPcode22':
         print_error_message(
             'Language of source file has to be \'IPPcode22\'',
             ERROR_XML_UNEXPECTED_STRUCTURE,
             inspect.currentframe().f_lineno
         )
 
-    # Cycle through the instructions
-    for instruct in root:
-        ins_check(instruct)
 
-        # Loads the arguments
-        arguments = []
+def load_instruction(instruct, program: Program):
+    """
+    The function loads the instruction element with its arguments into the program
+    @param instruct: The instruction element
+    @param program: The program class
+    """
+    ins_check(instruct)
+
+    # Finds the first element of every argument
+    args = {}
+    for arg in instruct:
+        if arg.tag not in args:
+            args[arg.tag] = arg
+
+    # Loads the arguments
+    arguments = []
+
+    arg1 = args.get('arg1')
+    arg2 = args.get('arg2')
+    arg3 = args.get('arg3')
+
+    if arg1 is not None:
+        arg_check(arg1)
+        arguments.append(Argument(sys.intern(arg1.attrib['type']), arg1.text))
+
+        if arg2 is not None:
+            arg_check(arg2)
+            arguments.append(Argument(sys.intern(arg2.attrib['type']), arg2.text))
+
+            if arg3 is not None:
+                arg_check(arg3)
+                arguments.append(Argument(sys.intern(arg3.attrib['type']), arg3.text))
+
+    # Adds instructions to the program, opcodes are interned, so all instructions share them
+    program.add_instruction(
+        Instruction(
+            instruct.attrib['order'],
+            sys.intern(instruct.attrib['opcode'].upper()),
+            arguments
+        )
+    )
 
-        arg1 = instruct.find('arg1')
-        arg2 = instruct.find('arg2')
-        arg3 = instruct.find('arg3')
 
-        if arg1 is not None:
-            arg_check(arg1)
-            arguments.append(Argument(arg1.attrib['type'], arg1.text))
+def load_xml(source_file, program: Program):
+    """
+	The function reads xml file and loads the instructions and their arguments while the file is read,
+	every instruction element is freed after it's loaded, so the whole tree is never in the memory
+	@param source_file: Name of the xml file or file object
+	@param program:	The program class
+	"""
+    root = None
+    depth = 0
 
-            if arg2 is not None:
-                arg_check(arg2)
-                arguments.append(Argument(arg2.attrib['type'], arg2.text))
+    # Cycle through the elements as they are read and catches the exceptions
+    try:
+        for event, element in ET.iterparse(source_file, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+
+                # Checks the root as soon as it's read
+                if depth == 1:
+                    root = element
+                    root_check(root)
+            else:
+                depth -= 1
 
-                if arg3 is not None:
-                    arg_check(arg3)
-                    arguments.append(Argument(arg3.attrib['type'], arg3.text))
+                # Instruction element with its arguments is complete
+                if depth == 1:
+                    load_instruction(element, program)
 
-        # Adds instructions to the program
-        program.add_instruction(
-            Instruction(
-                instruct.attrib['order'],
-                instruct.attrib['opcode'].upper(),
-                arguments
-            )
+                    # Frees the loaded instruction
+                    element.clear()
+                    root.clear()
+    except FileNotFoundError:
+        print_error_message(
+            'Source file was not found\nFile name: ' + source_file,
+            ERROR_OPEN_INPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+    except PermissionError:
+        print_error_message(
+            'Permission denied in opening file',
+            ERROR_OPEN_INPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+    except (ET.ParseError, OSError):
+        print_error_message(
+            'Xml not well formed',
+            ERROR_XML_NOT_WELL_FORMED,
+            inspect.currentframe().f_lineno
         )
 
     # Sorts instructions and rewrites their orders
     program.sort_instructions()
 
+    # Decodes the arguments of the instructions
+    program.load_operands()
+
     # Loads the labels to the program list of labels
     program.load_labels()
 
+    # Resolves the functions of the instructions
+    program.load_functions()
 
-def main():
-    """
-	Main program function
-	"""
-    arguments = sys.argv  # Load arguments into variable
-    arguments.pop(0)  # Remove 'interpret.py' parameter from list
 
-    # Checks arguments and sets the source_file and input_file
-    source_file, input_lines = check_arguments(arguments)
+# region Cache
 
-    # Loads the xml tree and catches the exceptions
-    tree = None
+def read_source(source_file) -> bytes:
+    """
+    Reads the content of the source file and catches the exceptions
+    @param source_file: Name of the xml file or file object
+    @return: Content of the source file
+    """
     try:
-        tree = ET.parse(source_file)
+        if type(source_file) is str:
+            with open(source_file, 'rb') as f:
+                return f.read()
+
+        return source_file.buffer.read()
     except FileNotFoundError:
         print_error_message(
             'Source file was not found\nFile name: ' + source_file,
@@ -1979,24 +3930,868 @@ def main():
             ERROR_OPEN_INPUT_FILE,
             inspect.currentframe().f_lineno
         )
-    except (ET.ParseError, OSError):
+    except OSError:
         print_error_message(
-            'Xml not well formed',
-            ERROR_XML_NOT_WELL_FORMED,
+            'Source file can\'t be read',
+            ERROR_OPEN_INPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+
+
+def get_cache_key(source: bytes) -> str:
+    """
+    The key of the source is the hash of the source, the interpreter and the python version,
+    so the cached program is never used by another version of the interpreter
+    @param source: Content of the source file
+    @return: Key of the source in the cache
+    """
+    key = hashlib.sha256(sys.version.encode())
+
+    with open(__file__, 'rb') as f:
+        key.update(f.read())
+
+    key.update(source)
+
+    return key.hexdigest()
+
+
+def encode_operand(operand):
+    """
+    Encodes the operand into the types supported by marshal
+    @param operand: Decoded operand of the instruction
+    @return: Encoded operand
+    """
+    if type(operand) is tuple:
+        # Variable
+        return 'var', operand[0], operand[1]
+    elif type(operand) is Variable:
+        # Constant
+        return 'const', operand.type.value, operand.value
+
+    # Target of the jump, label or type
+    return operand
+
+
+def decode_cached_operand(operand):
+    """
+    Decodes the operand encoded by encode_operand
+    @param operand: Encoded operand
+    @return: Decoded operand of the instruction
+    """
+    if type(operand) is not tuple:
+        return operand
+
+    if operand[0] == 'var':
+        return operand[1], sys.intern(operand[2])
+
+    # The value of the constant is already translated, so it's assigned directly
+    constant = Variable(None)
+    constant.type = Type(operand[1])
+    constant.value = operand[2]
+    constant.is_init = True
+
+    return constant
+
+
+def save_to_cache(program: Program, cache_dir: str, key: str, cache_size: int):
+    """
+    Saves the loaded program to the cache, then removes the least recently used programs over the size limit
+    The cache is only an optimization, so its errors are ignored
+    @param program: Loaded program
+    @param cache_dir: Directory of the cache
+    @param key: Key of the source
+    @param cache_size: Size limit of the cache in bytes
+    """
+    data = marshal.dumps(tuple(
+        (ins.order, ins.opcode, tuple(encode_operand(operand) for operand in ins.operands))
+        for ins in program.instructions
+    ))
+
+    write_to_cache(cache_dir, key + CACHE_EXTENSION, data, cache_size)
+
+
+def write_to_cache(cache_dir: str, file_name: str, data: bytes, cache_size: int):
+    """
+    Writes the file to the cache, then removes the least recently used files over the size limit
+    The cache is only an optimization, so its errors are ignored
+    @param cache_dir: Directory of the cache
+    @param file_name: Name of the file in the cache
+    @param data: Content of the file
+    @param cache_size: Size limit of the cache in bytes
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # The file is written under temporary name, so other processes never read a partial file
+        path = os.path.join(cache_dir, file_name)
+        temporary_path = path + '.' + str(os.getpid())
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+
+        # Removes the least recently used files
+        entries = []
+        total_size = 0
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(CACHE_EXTENSION) or entry.name.endswith(PYTHON_CACHE_EXTENSION):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        entries.sort()
+        for mtime, size, entry_path in entries:
+            if total_size <= cache_size:
+                break
+            os.remove(entry_path)
+            total_size -= size
+    except OSError:
+        pass
+
+
+def load_from_cache(program: Program, cache_dir: str, key: str) -> bool:
+    """
+    Loads the program from the cache, the file is mapped into the memory and decoded without copying
+    @param program: The program class
+    @param cache_dir: Directory of the cache
+    @param key: Key of the source
+    @return: If the program was found in the cache
+    """
+    path = os.path.join(cache_dir, key + CACHE_EXTENSION)
+
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                instructions = marshal.loads(data)
+
+        # The same operands are decoded only once, constants are never modified, so they can be shared
+        decoded_operands = {}
+        for order, opcode, operands in instructions:
+            ins = Instruction(order, opcode, ())
+
+            decoded = []
+            for operand in operands:
+                if operand not in decoded_operands:
+                    decoded_operands[operand] = decode_cached_operand(operand)
+                decoded.append(decoded_operands[operand])
+
+            ins.operands = tuple(decoded)
+            program.instructions.append(ins)
+
+            # The targets of the jumps are already resolved, the labels are added as load_labels adds them
+            if opcode == 'LABEL':
+                program.add_label(Label(ins.operands[0], order))
+
+        program.load_functions()
+
+        # Marks the program as recently used
+        os.utime(path)
+    except (OSError, ValueError, EOFError, TypeError, KeyError):
+        # Damaged file is loaded again from the xml file
+        program.instructions = []
+        program.labels = {}
+        return False
+
+    return True
+
+
+def load_cached_xml(source_file, program: Program, options: Options):
+    """
+    Loads the program from the cache, if the program is not in the cache
+    loads it from the xml file and then saves it to the cache
+    @param source_file: Name of the xml file or file object
+    @param program: The program class
+    @param options: Options of the cache
+    """
+    source = read_source(source_file)
+    key = get_cache_key(source)
+
+    if load_from_cache(program, options.cache_dir, key):
+        return
+
+    load_xml(io.BytesIO(source), program)
+    save_to_cache(program, options.cache_dir, key, options.cache_size)
+
+
+# endregion
+
+
+# region Transpiler
+
+def transpile_operand(operand, name: str) -> tuple:
+    """
+    Transpiles the operand of the instruction into the Python code
+    @param operand: Pair of the frame and the name of the variable or constant variable
+    @param name: Name of the local variable of the generated code
+    @return: Statement which fetches the variable or None for the constant, the type of the constant or None
+             for the variable, expression of the value
+    """
+    if type(operand) is not tuple:
+        return None, operand.type, repr(operand.value)
+
+    frame, var_name = operand
+    if frame == 'GF':
+        fetch = name + ' = gf_get(' + repr(var_name) + ')'
+    elif frame == 'LF':
+        fetch = name + ' = local_frames[-1].variables.get(' + repr(var_name) + ') if local_frames else None'
+    else:
+        fetch = name + ' = frames.temporary_frame.variables.get(' + repr(var_name) \
+                + ') if frames.temporary_frame is not None else None'
+
+    return fetch, None, name + '.value'
+
+
+def transpile_type_check(operands: list, allowed_types: tuple):
+    """
+    Transpiles the check of the types of the operands, the operands must have the same allowed type,
+    the types of the constants are checked already by the transpilation
+    @param operands: Transpiled operands with the names of their local variables
+    @param allowed_types: Allowed types of the operands
+    @return: Conditions of the fast path or None if the fast path is never taken
+    """
+    conditions = []
+    constant_types = set(constant_type for name, (fetch, constant_type, value) in operands if fetch is None)
+
+    if len(constant_types) > 1 or constant_types - set(allowed_types):
+        return None
+
+    variables = [name for name, (fetch, constant_type, value) in operands if fetch is not None]
+    conditions.extend(name + ' is not None' for name in variables)
+
+    if constant_types:
+        constant_type, = constant_types
+        conditions.extend(name + '.type is TYPE_' + constant_type.name for name in variables)
+    elif variables:
+        conditions.extend(name + '.type is ' + variables[0] + '.type' for name in variables[1:])
+        conditions.append('(' + ' or '.join(
+            variables[0] + '.type is TYPE_' + allowed_type.name for allowed_type in allowed_types
+        ) + ')')
+
+    return conditions
+
+
+def transpile_instruction(iteration: int, ins: Instruction) -> tuple:
+    """
+    Transpiles the instruction into the lines of the Python code, the fast path of the instruction is taken
+    if the variables exist and have the expected types, otherwise the function of the instruction is called
+    @param iteration: Iteration of the instruction
+    @param ins: The instruction
+    @return: Lines of the code and if the lines return the next iteration
+    """
+    generic = 'step(' + str(iteration) + ')'
+    standard = ins.function is Program.functions[ins.opcode]
+
+    # The specialized and fused instructions and the jumps can change the iteration
+    if not standard or ins.opcode in Program.jump_opcodes and ins.opcode not in Program.python_jump_opcodes:
+        return ['return ' + generic], True
+
+    if ins.opcode == 'LABEL':
+        return ['pass'], False
+
+    if ins.opcode == 'JUMP':
+        target = ins.operands[0]
+        return [
+            'program.iteration = ' + str(iteration),
+            'jump(' + str(target) + ')',
+            'return ' + str(target + 1),
+        ], True
+
+    if ins.opcode in ('JUMPIFEQ', 'JUMPIFNEQ'):
+        target, symb1, symb2 = ins.operands
+        operands = [('a', transpile_operand(symb1, 'a')), ('b', transpile_operand(symb2, 'b'))]
+        conditions = transpile_type_check(operands, Program.closure_comparable_types)
+        if conditions is None:
+            return ['return ' + generic], True
+
+        comparison = ' == ' if ins.opcode == 'JUMPIFEQ' else ' != '
+        return [fetch for name, (fetch, constant_type, value) in operands if fetch is not None] + [
+            'if ' + (' and '.join(conditions) or 'True') + ':',
+            '    if ' + operands[0][1][2] + comparison + operands[1][1][2] + ':',
+            '        program.iteration = ' + str(iteration),
+            '        jump(' + str(target) + ')',
+            '        return ' + str(target + 1),
+            '    return ' + str(iteration + 1),
+            'return ' + generic,
+        ], True
+
+    if ins.opcode == 'MOVE':
+        var, symb = ins.operands
+        fetch, constant_type, value = transpile_operand(symb, 's')
+        lines = [transpile_operand(var, 'd')[0]]
+        conditions = ['d is not None']
+        if fetch is not None:
+            lines.append(fetch)
+            conditions += ['s is not None', 's.is_init']
+
+        return lines + [
+            'if ' + ' and '.join(conditions) + ':',
+            '    d.type = ' + ('s.type' if fetch is not None else 'TYPE_' + constant_type.name),
+            '    d.value = ' + value,
+            '    d.is_init = True',
+            'else:',
+            '    ' + generic,
+        ], False
+
+    if ins.opcode == 'WRITE':
+        fetch, constant_type, value = transpile_operand(ins.operands[0], 's')
+        if fetch is None:
+            # The printed text of the constant is known already
+            if constant_type is Type.STRING:
+                return ['output_write(' + value + ')'], False
+            if constant_type is Type.INT:
+                return ['output_write(' + repr(str(ins.operands[0].value)) + ')'], False
+            if constant_type is Type.BOOLEAN:
+                return ['output_write(' + repr('true' if ins.operands[0].value else 'false') + ')'], False
+            return ['pass'], False
+
+        return [
+            fetch,
+            'if s is None or not s.is_init:',
+            '    ' + generic,
+            'elif s.type is TYPE_STRING:',
+            '    output_write(s.value)',
+            'elif s.type is TYPE_INT:',
+            '    output_write(str(s.value))',
+            'elif s.type is TYPE_BOOLEAN:',
+            '    output_write(\'true\' if s.value else \'false\')',
+        ], False
+
+    if ins.opcode == 'PUSHS':
+        fetch, constant_type, value = transpile_operand(ins.operands[0], 's')
+        if fetch is None:
+            return ['stack_push(TYPE_' + constant_type.name + ', ' + value + ')'], False
+
+        return [
+            fetch,
+            'if s is not None and s.is_init:',
+            '    stack_push(s.type, s.value)',
+            'else:',
+            '    ' + generic,
+        ], False
+
+    if ins.opcode == 'POPS':
+        return [
+            transpile_operand(ins.operands[0], 'd')[0],
+            'if d is not None and stack.values:',
+            '    d.type, d.value = stack.pop()',
+            '    d.is_init = True',
+            'else:',
+            '    ' + generic,
+        ], False
+
+    if ins.opcode in Program.python_operators:
+        var, symb1, symb2 = ins.operands
+        operation, operand_types, result_type = Program.closure_operations[ins.opcode]
+        operands = [('a', transpile_operand(symb1, 'a')), ('b', transpile_operand(symb2, 'b'))]
+        conditions = transpile_type_check(operands, operand_types)
+        if conditions is None:
+            return [generic], False
+
+        return [transpile_operand(var, 'd')[0]] \
+            + [fetch for name, (fetch, constant_type, value) in operands if fetch is not None] + [
+            'if ' + ' and '.join(['d is not None'] + conditions) + ':',
+            '    d.value = ' + operands[0][1][2] + ' ' + Program.python_operators[ins.opcode] + ' '
+            + operands[1][1][2],
+            '    d.type = TYPE_' + result_type.name,
+            '    d.is_init = True',
+            'else:',
+            '    ' + generic,
+        ], False
+
+    return [generic], False
+
+
+def generate_python(program: Program) -> str:
+    """
+    Generates the Python module of the program, every block of the instructions between the jumps and the labels
+    is the function block_ITERATION which proceeds the block and returns the next iteration
+    @param program: The loaded program
+    @return: Source of the module
+    """
+    instructions = program.instructions
+    number_of_instructions = len(instructions)
+
+    # The blocks start after the labels and after the instructions which can change the iteration
+    transpiled = [transpile_instruction(iteration, ins) for iteration, ins in enumerate(instructions)]
+    leaders = {0}
+    for iteration, ins in enumerate(instructions):
+        if ins.opcode == 'LABEL' or transpiled[iteration][1]:
+            leaders.add(iteration + 1)
+
+    lines = ['# Generated from the IPPcode22 program by interpret.py']
+    for iteration, ins in enumerate(instructions):
+        if iteration in leaders:
+            lines += ['', '', 'def block_' + str(iteration) + '():']
+
+        lines.append('    # ' + str(iteration) + ': ' + ins.opcode)
+        lines += ['    ' + line for line in transpiled[iteration][0]]
+
+        # The block which doesn't end by the jump continues by the following block
+        if iteration + 1 in leaders and not transpiled[iteration][1] and iteration + 1 < number_of_instructions:
+            lines.append('    return ' + str(iteration + 1))
+
+    # The last block returns the end of the program
+    if instructions and not transpiled[-1][1]:
+        lines.append('    return ' + str(number_of_instructions))
+
+    return '\n'.join(lines) + '\n'
+
+
+def transpile_trace(program: Program, head: int, path: list) -> str:
+    """
+    Transpiles the recorded trace of the loop into the function trace_HEAD, which repeats the loop
+    The fast paths are specialized to the recorded types, the failed guard leaves the trace by guard_failed,
+    which proceeds the instruction by its function, the branch different from the recorded one leaves the trace
+    too, and the instructions without the fast path are proceeded by their functions
+    The trace follows the calls and the fused instructions by their recorded next iterations
+    @param program: The program
+    @param head: Iteration of the label of the loop
+    @param path: Recorded iterations and types of the operands by record_trace
+    @return: Source of the function, which returns the next iteration of the interpretation
+    """
+    lines = ['def trace_' + str(head) + '():', '    while True:']
+    value_types = Program.closure_comparable_types
+
+    for index, (iteration, types) in enumerate(path):
+        ins = program.instructions[iteration]
+        last = index + 1 == len(path)
+        next_iteration = head + 1 if last else path[index + 1][0]
+        generic = 'step(' + str(iteration) + ')'
+        guard = ['return guard_failed(' + str(head) + ', ' + str(iteration) + ')']
+        code = [generic]
+
+        # The instruction which can change the iteration is proceeded by its function,
+        # the trace continues only by the recorded next iteration, e.g. CALL continues in the called function
+        branch = [
+            'if ' + generic + ' != ' + str(next_iteration) + ':',
+            '    return program.iteration + 1',
+        ]
+
+        if ins.function is not Program.functions[ins.opcode] \
+                or ins.opcode in Program.jump_opcodes and ins.opcode not in Program.python_jump_opcodes:
+            code = branch
+        elif ins.opcode == 'LABEL':
+            code = ['pass']
+        elif ins.opcode == 'JUMP':
+            code = ['program.iteration = ' + str(iteration), 'jump(' + str(ins.operands[0]) + ')']
+        elif ins.opcode in ('JUMPIFEQ', 'JUMPIFNEQ'):
+            target, symb1, symb2 = ins.operands
+            operands = [('a', transpile_operand(symb1, 'a')), ('b', transpile_operand(symb2, 'b'))]
+            conditions = None
+            if types[1] is types[2] and types[1] in value_types:
+                conditions = transpile_type_check(operands, (types[1],))
+
+            if conditions is None:
+                code = branch
+            else:
+                comparison = operands[0][1][2] + (' == ' if ins.opcode == 'JUMPIFEQ' else ' != ') + operands[1][1][2]
+                code = [fetch for name, (fetch, constant_type, value) in operands if fetch is not None]
+                if conditions:
+                    code += ['if not (' + ' and '.join(conditions) + '):', '    ' + guard[0]]
+
+                # The recorded branch continues the trace, the other one leaves it
+                if next_iteration == target + 1:
+                    code += [
+                        'if not (' + comparison + '):',
+                        '    return ' + str(iteration + 1),
+                        'program.iteration = ' + str(iteration),
+                        'jump(' + str(target) + ')',
+                    ]
+                else:
+                    code += [
+                        'if ' + comparison + ':',
+                        '    program.iteration = ' + str(iteration),
+                        '    jump(' + str(target) + ')',
+                        '    return ' + str(target + 1),
+                    ]
+        elif ins.opcode == 'MOVE' and types[1] in value_types:
+            fetch, constant_type, value = transpile_operand(ins.operands[1], 's')
+            conditions = transpile_type_check([('s', (fetch, constant_type, value))], (types[1],))
+            code = [transpile_operand(ins.operands[0], 'd')[0]] + ([fetch] if fetch is not None else []) + [
+                'if not (' + ' and '.join(['d is not None'] + conditions) + '):',
+                '    ' + guard[0],
+                'd.type = TYPE_' + types[1].name,
+                'd.value = ' + value,
+                'd.is_init = True',
+            ]
+        elif ins.opcode == 'WRITE' and types[0] in value_types:
+            fetch, constant_type, value = transpile_operand(ins.operands[0], 's')
+            if fetch is None:
+                code = transpile_instruction(iteration, ins)[0]
+            else:
+                written = {
+                    Type.STRING: 'output_write(s.value)',
+                    Type.INT: 'output_write(str(s.value))',
+                    Type.BOOLEAN: 'output_write(\'true\' if s.value else \'false\')',
+                    Type.NULL: 'pass',
+                }
+                code = [
+                    fetch,
+                    'if s is None or s.type is not TYPE_' + types[0].name + ':',
+                    '    ' + guard[0],
+                    written[types[0]],
+                ]
+        elif ins.opcode == 'PUSHS' and types[0] in value_types:
+            fetch, constant_type, value = transpile_operand(ins.operands[0], 's')
+            if fetch is None:
+                code = transpile_instruction(iteration, ins)[0]
+            else:
+                code = [
+                    fetch,
+                    'if s is None or s.type is not TYPE_' + types[0].name + ':',
+                    '    ' + guard[0],
+                    'stack_push(TYPE_' + types[0].name + ', s.value)',
+                ]
+        elif ins.opcode == 'POPS':
+            code = [
+                transpile_operand(ins.operands[0], 'd')[0],
+                'if d is None or not stack.values:',
+                '    ' + guard[0],
+                'd.type, d.value = stack.pop()',
+                'd.is_init = True',
+            ]
+        elif ins.opcode in Program.python_operators and types[1] is types[2] \
+                and types[1] in Program.closure_operations[ins.opcode][1]:
+            var, symb1, symb2 = ins.operands
+            result_type = Program.closure_operations[ins.opcode][2]
+            operands = [('a', transpile_operand(symb1, 'a')), ('b', transpile_operand(symb2, 'b'))]
+            conditions = transpile_type_check(operands, (types[1],))
+            if conditions is not None:
+                code = [transpile_operand(var, 'd')[0]] \
+                    + [fetch for name, (fetch, constant_type, value) in operands if fetch is not None] + [
+                    'if not (' + ' and '.join(['d is not None'] + conditions) + '):',
+                    '    ' + guard[0],
+                    'd.value = ' + operands[0][1][2] + ' ' + Program.python_operators[ins.opcode] + ' '
+                    + operands[1][1][2],
+                    'd.type = TYPE_' + result_type.name,
+                    'd.is_init = True',
+                ]
+
+        lines.append('        # ' + str(iteration) + ': ' + ins.opcode)
+        lines += ['        ' + line for line in code]
+
+    # The trace ends by the jump back to the label
+    lines.append('        continue')
+
+    return '\n'.join(lines) + '\n'
+
+
+def compile_python(program: Program, options: Options):
+    """
+    Generates and compiles the Python module of the program, the compiled code is cached by the hash
+    of the generated source in the cache directory if it's set
+    @param program: The loaded program
+    @param options: Options of the cache
+    @return: Compiled code of the module
+    """
+    source = generate_python(program)
+
+    if options.cache_dir is None:
+        return compile(source, '<ippcode22>', 'exec')
+
+    # The marshal format of the code depends on the python version
+    key = hashlib.sha256(sys.version.encode() + source.encode()).hexdigest()
+    path = os.path.join(options.cache_dir, key + PYTHON_CACHE_EXTENSION)
+
+    try:
+        with open(path, 'rb') as f:
+            code = marshal.loads(f.read())
+        os.utime(path)
+        return code
+    except (OSError, ValueError, EOFError, TypeError):
+        pass
+
+    code = compile(source, '<ippcode22>', 'exec')
+    write_to_cache(options.cache_dir, key + PYTHON_CACHE_EXTENSION, marshal.dumps(code), options.cache_size)
+
+    return code
+
+
+# endregion
+
+
+# region API
+def run_program(source, input_data: bytes = b'', max_steps=None, max_output=None, optimize: bool = False) -> tuple:
+    """
+    Interprets the program in the current process, the outputs are collected instead of written
+    to the standard streams and the errors are returned instead of ending the process,
+    so one process can interpret many programs
+    @param source: XML of the program as bytes or name of the xml file
+    @param input_data: Input of the READ instruction
+    @param max_steps: Maximal number of the proceeded functions or None
+    @param max_output: Maximal number of the bytes of the output or None
+    @param optimize: Optimizes the program as interpret.py --optimize
+    @return: Return code, the output and the stderr of the program as bytes
+    """
+    stdout = io.BytesIO()
+    stderr = io.StringIO()
+    output = Output(stdout, limit=float('inf') if max_output is None else max_output)
+    program = Program(InputReader(io.BytesIO(input_data)), output, stderr)
+    if max_steps is not None:
+        program.max_steps = max_steps
+
+    def load(loaded_program):
+        load_xml(io.BytesIO(source) if isinstance(source, bytes) else source, loaded_program)
+        if optimize:
+            loaded_program.propagate_constants()
+            loaded_program.specialize_instructions()
+            loaded_program.fuse_instructions(False)
+
+    code = run_collected(program, load)
+
+    return code, stdout.getvalue(), stderr.getvalue().encode('utf-8', 'replace')
+
+
+def run_collected(program: Program, load, engine: str = 'default', code=None) -> int:
+    """
+    Loads and interprets the program whose output and stderr are collected,
+    the error message is written to the stderr of the program
+    @param program: The program with the collected output and stderr
+    @param load: Function which loads the instructions into the program
+    @param engine: Engine of the interpretation
+    @param code: Compiled code of the python engine
+    @return: Return code of the program
+    """
+    try:
+        try:
+            load(program)
+            program.run_engine(engine, code)
+        finally:
+            # The output is flushed by EXIT and by errors too, the flush can exceed the limit of the output
+            program.output.flush()
+    except ProgramExit as program_exit:
+        return program_exit.code
+    except InterpretError as error:
+        error.write(program.error_stream)
+        return error.code
+
+    return NO_ERROR
+
+
+# endregion
+
+
+# region Batch
+batch_program = None  # The loaded program shared by the forked workers of the batch
+batch_engine = 'default'  # Engine of the interpretation of the batch
+batch_code = None  # Code of the python engine compiled once for all workers of the batch
+
+
+def get_batch_inputs(pattern: str) -> list:
+    """
+    @param pattern: Directory with the input files or glob pattern of the input files
+    @return: Sorted names of the input files
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*')
+
+    inputs = sorted(name for name in glob.glob(pattern) if os.path.isfile(name))
+
+    if not inputs:
+        print_error_message(
+            'No input files of the batch: ' + pattern,
+            ERROR_OPEN_INPUT_FILE,
             inspect.currentframe().f_lineno
         )
 
-    # Creates new program
-    my_program = Program(input_lines)
+    return inputs
+
+
+def get_batch_result_names(pattern: str, inputs: list) -> list:
+    """
+    Names the results by the paths of the input files relative to the root of the batch without the extension,
+    the root is the directory or the part of the glob pattern before the first wildcard
+    @param pattern: Directory with the input files or glob pattern of the input files
+    @param inputs: Names of the input files
+    @return: Names of the results in the order of the inputs
+    """
+    if os.path.isdir(pattern):
+        root = pattern
+    else:
+        parts = pattern.split(os.sep)
+        prefix = itertools.takewhile(lambda part: not glob.has_magic(part), parts[:-1])
+        root = os.sep.join(prefix) or os.curdir
+
+    names = [os.path.splitext(os.path.relpath(input_file, root))[0] for input_file in inputs]
+
+    # The inputs which differ only by the extension would overwrite the results of each other
+    seen = {}
+    for input_file, name in zip(inputs, names):
+        if name in seen:
+            print_error_message(
+                'Inputs ' + seen[name] + ' and ' + input_file + ' have the same name of the result: ' + name,
+                ERROR_OPEN_OUTPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+        seen[name] = input_file
+
+    return names
+
+
+def run_batch_input(input_file: str) -> tuple:
+    """
+    Interprets the loaded program of the batch with one input file in the worker,
+    the new program shares the instructions, so only the frames and the stacks are created again
+    @param input_file: Name of the input file
+    @return: Name of the input file, return code, the output as bytes and the stderr as text
+    """
+    stdout = io.BytesIO()
+    stderr = io.StringIO()
+    program = Program(None, Output(stdout), stderr)
+
+    def load(loaded_program):
+        loaded_program.input_reader = open_input(input_file)
+        loaded_program.instructions = batch_program.instructions
 
-    # Loads the instructions into the program
-    load_xml(tree, my_program)
+    code = run_collected(program, load, batch_engine, batch_code)
 
-    # The interpretation of the program
-    while not my_program.is_iteration_at_the_end():
-        my_program.call_function(my_program.get_instruction().opcode)
+    return input_file, code, stdout.getvalue(), stderr.getvalue()
 
 
-# The calling of the main function
+def run_batch(program: Program, options: Options):
+    """
+    Interprets the loaded program with every input file of the batch by the forked workers,
+    the workers share the loaded program with this process until they change its pages
+    The results are written to the directory as NAME.out, NAME.rc and NAME.err (if not empty)
+    by the path of the input file relative to the root of the batch without the extension,
+    or to the stdout as JSON lines in the order of the inputs
+    @param program: The loaded program
+    @param options: Options of the batch and the engine of the interpretation
+    """
+    global batch_program, batch_engine, batch_code
+    batch_program = program
+    batch_engine = options.engine
+
+    # The code of the python engine is compiled before the workers are forked, so they share it
+    if options.engine == 'python':
+        batch_code = compile_python(program, options)
+    inputs = get_batch_inputs(options.batch)
+
+    if options.batch_output is not None:
+        names = get_batch_result_names(options.batch, inputs)
+        try:
+            for directory in sorted(set(os.path.dirname(name) for name in names)):
+                os.makedirs(os.path.join(options.batch_output, directory), exist_ok=True)
+        except OSError:
+            print_error_message(
+                'Directory of the results can\'t be created: ' + options.batch_output,
+                ERROR_OPEN_OUTPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+        results = dict(zip(inputs, names))
+
+    jobs = min(options.jobs or os.cpu_count() or 1, len(inputs))
+    with multiprocessing.get_context('fork').Pool(jobs) as pool:
+        for input_file, code, stdout, stderr in pool.imap(run_batch_input, inputs):
+            if options.batch_output is None:
+                sys.stdout.write(json.dumps({
+                    'input': input_file,
+                    'code': code,
+                    'stdout': stdout.decode('utf-8'),
+                    'stderr': stderr,
+                }) + '\n')
+                continue
+
+            name = os.path.join(options.batch_output, results[input_file])
+            try:
+                with open(name + '.out', 'wb') as f:
+                    f.write(stdout)
+                with open(name + '.rc', 'w') as f:
+                    f.write(str(code) + '\n')
+                if stderr:
+                    with open(name + '.err', 'w') as f:
+                        f.write(stderr)
+            except OSError:
+                print_error_message(
+                    'Result can\'t be written: ' + name,
+                    ERROR_OPEN_OUTPUT_FILE,
+                    inspect.currentframe().f_lineno
+                )
+
+    sys.stdout.flush()
+
+
+# endregion
+
+
+def main():
+    """
+	Main program function
+	"""
+    arguments = sys.argv  # Load arguments into variable
+    arguments.pop(0)  # Remove 'interpret.py' parameter from list
+
+    # Checks arguments and sets the source_file, input_reader and options
+    source_file, input_reader, options = check_arguments(arguments)
+
+    # Creates new program with the buffered standard output
+    output = Output(
+        sys.stdout.buffer,
+        options.output_buffer_size,
+        options.interleave,
+        sys.stdout.encoding,
+        sys.stdout.errors
+    )
+    my_program = Program(input_reader, output)
+
+    # Loads the instructions from the cache or from the xml file into the program,
+    # the loaded objects live until the end, so the garbage collector doesn't have to check them
+    gc.disable()
+    if options.cache_dir is not None:
+        load_cached_xml(source_file, my_program, options)
+    else:
+        load_xml(source_file, my_program)
+
+    # The cache contains the program before the optimization
+    if options.optimize:
+        my_program.propagate_constants()
+        my_program.specialize_instructions()
+        my_program.fuse_instructions(options.show_fusions)
+    gc.freeze()
+    gc.enable()
+
+    if options.batch is not None:
+        run_batch(my_program, options)
+        return
+
+    # The interpretation of the program, the output is flushed and the profile is written at the end,
+    # by EXIT and by errors too
+    profile = None
+    trace = None
+    try:
+        if options.profile is not None:
+            profile = Profile(len(my_program.instructions))
+            my_program.run_profiled(profile)
+        elif options.trace_size is not None:
+            trace = Trace(options.trace_size, options.trace_file)
+            if hasattr(signal, 'SIGUSR1'):
+                signal.signal(signal.SIGUSR1, lambda signal_number, frame: trace.dump(my_program))
+            my_program.run_traced(trace)
+        elif options.engine == 'python':
+            my_program.run_engine(options.engine, compile_python(my_program, options))
+        else:
+            my_program.run_engine(options.engine)
+    except ProgramExit:
+        raise
+    except Exception:
+        if trace is not None:
+            trace.dump(my_program)
+        raise
+    finally:
+        output.flush()
+        if profile is not None:
+            # The report is only the side channel, its error is reported without changing the return code
+            try:
+                profile.write_report(options.profile, my_program.instructions)
+            except InterpretError as error:
+                error.write(sys.stderr)
+
+
+# The calling of the main function, the errors and EXIT instruction end the interpreter with their codes
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except InterpretError as error:
+        error.write(sys.stderr)
+        exit(error.code)
+    except ProgramExit as program_exit:
+        exit(program_exit.code)
@@ -0,0 +1,385 @@
+"""
+-----------------------------------------------------------------------------
+@project 	:		Interpreter IPP 2022
+@file 		:		run_tests.py
+@email		:		xdzuri00@stud.fit.vutbr.cz
+@author 	:		Adam Dzurilla, xdzuri00
+-----------------------------------------------------------------------------
+"""
+
+import sys
+import io
+import os
+import json
+import time
+import signal
+import hashlib
+import inspect
+import traceback
+import multiprocessing
+from xml.sax.saxutils import escape, quoteattr
+
+import interpret
+
+DEFAULT_CACHE_FILE = '.run_tests_cache.json'
+DEFAULT_TIMEOUT = 10  # Time limit of one test in seconds
+
+
+class TestTimeout(Exception):
+    """
+    The test exceeded the time limit
+    """
+
+
+def print_help_message():
+    """
+    The function prints help message
+    """
+    print("Usage:")
+    print("\tpython3.8 run_tests.py [OPTIONS]")
+    print()
+    print("Options:")
+    print("\t--help\t\t\tDisplay this message")
+    print("\t--directory=PATH\tSet directory with tests (default the current directory)")
+    print("\t--recursive\t\tCheck the subdirectories of the directory with tests too")
+    print("\t--jobs=N\t\tNumber of the worker processes (default the number of the processors)")
+    print("\t--timeout=SECONDS\tTime limit of one test (default 10)")
+    print("\t--cache=FILE\t\tSet file of the cached results (default .run_tests_cache.json)")
+    print("\t--no-cache\t\tRun all tests without the cached results")
+    print("\t--junit=FILE\t\tWrite the results to the file as JUnit XML")
+    print("\t--json=FILE\t\tWrite the results to the file as JSON lines")
+    print()
+    print("The program interprets the XML .src files by interpret.py the same way as test.php --int-only,")
+    print("the tests are run by the worker processes without starting interpret.py for every test")
+    print("Only the tests of --int-only are supported, the IPPcode22 sources of the tests of both scripts")
+    print("need parse.php, so they are run by test.php")
+
+    exit(interpret.NO_ERROR)
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    @param data: Hashed data
+    @return: Hexadecimal SHA-256 hash of the data
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def read_file(file_name: str, default=None):
+    """
+    @param file_name: Name of the file
+    @param default: The value returned if the file doesn't exist
+    @return: Content of the file as bytes
+    """
+    try:
+        with open(file_name, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return default
+
+
+def get_tests(directory: str, recursive: bool) -> list:
+    """
+    Gets the tests by the .src files in the directory
+    @param directory: Directory with tests
+    @param recursive: Searches the subdirectories too
+    @return: Sorted paths of the tests without the extension
+    """
+    tests = []
+
+    for path, directories, files in os.walk(directory):
+        for file_name in files:
+            if file_name.endswith('.src'):
+                tests.append(os.path.join(path, file_name[:-4]))
+
+        # Only the directory itself is searched without the recursive argument
+        if not recursive:
+            break
+
+    return sorted(tests)
+
+
+def raise_timeout(signal_number, frame):
+    """
+    Handler of the alarm signal which interrupts the test
+    """
+    raise TestTimeout()
+
+
+def run_test(task: tuple) -> dict:
+    """
+    Interprets the source of the test in the worker process by interpret.run_collected,
+    so the tests are interpreted the same way as the programs of the embedding API
+    @param task: Path of the test, source and input of the test
+    @return: Return code, hash of the output, stderr and time of the test
+    """
+    path, source, input_data, timeout = task
+
+    output_stream = io.BytesIO()
+    stderr = io.StringIO()
+    program = interpret.Program(interpret.InputReader(io.BytesIO(input_data)), interpret.Output(output_stream), stderr)
+
+    def load(loaded_program):
+        interpret.load_xml(io.BytesIO(source), loaded_program)
+
+    start = time.perf_counter()
+    signal.signal(signal.SIGALRM, raise_timeout)
+
+    # The timer is armed and disarmed inside the try, so the alarm is always caught as the timeout of the test
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        code = interpret.run_collected(program, load)
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    except TestTimeout:
+        code = None
+    except Exception:
+        # The uncaught exception ends the interpreter with code 1
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        stderr.write(traceback.format_exc())
+        code = 1
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+    return {
+        'path': path,
+        'code': code,
+        'output_hash': hash_bytes(output_stream.getvalue()),
+        'stderr': stderr.getvalue()[:1000],
+        'time': time.perf_counter() - start,
+    }
+
+
+def evaluate(path: str, result: dict) -> dict:
+    """
+    Compares the result of the test with the expected return code and output as test.php does,
+    the output is compared only if the return code is zero and the .out file exists
+    @param path: Path of the test without the extension
+    @param result: The result of the test
+    @return: The result with the expected return code and the status
+    """
+    expected_rc = int((read_file(path + '.rc', b'0').strip() or b'0'))
+    expected_output = read_file(path + '.out')
+
+    result = dict(result, path=path, expected_rc=expected_rc)
+    if result['code'] is None:
+        result['status'] = 'timeout'
+    elif result['code'] != expected_rc:
+        result['status'] = 'wrong return code'
+    elif result['code'] == 0 and expected_output is not None and hash_bytes(expected_output) != result['output_hash']:
+        result['status'] = 'wrong output'
+    else:
+        result['status'] = 'passed'
+
+    return result
+
+
+class Reports:
+    """
+    The reports of the results written to the files as the results are evaluated
+    """
+
+    def __init__(self, junit_file, json_file):
+        """
+        @param junit_file: Name of the JUnit XML file or None
+        @param json_file: Name of the JSON lines file or None
+        """
+        self.junit = None
+        self.json = None
+
+        try:
+            if junit_file is not None:
+                self.junit = open(junit_file, 'w')
+                self.junit.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n<testsuite name="interpret">\n')
+            if json_file is not None:
+                self.json = open(json_file, 'w')
+        except OSError:
+            interpret.print_error_message(
+                'Report can\'t be opened',
+                interpret.ERROR_OPEN_OUTPUT_FILE,
+                inspect.currentframe().f_lineno
+            )
+
+    def write(self, result: dict):
+        """
+        Writes the evaluated result of the test
+        @param result: The result
+        """
+        if self.junit is not None:
+            directory, name = os.path.split(result['path'])
+            self.junit.write('<testcase classname=%s name=%s time="%.6f">' % (
+                quoteattr(directory.replace(os.sep, '.')), quoteattr(name), result['time']
+            ))
+            if result['status'] != 'passed':
+                message = '%s: expected %s, got %s' % (result['status'], result['expected_rc'], result['code'])
+                self.junit.write('<failure message=%s>%s</failure>' % (quoteattr(message), escape(result['stderr'])))
+            self.junit.write('</testcase>\n')
+            self.junit.flush()
+
+        if self.json is not None:
+            self.json.write(json.dumps(result) + '\n')
+            self.json.flush()
+
+    def close(self, summary: dict):
+        """
+        Finishes the reports
+        @param summary: Numbers of the tests
+        """
+        if self.junit is not None:
+            self.junit.write('</testsuite>\n</testsuites>\n')
+            self.junit.close()
+
+        if self.json is not None:
+            self.json.write(json.dumps({'summary': summary}) + '\n')
+            self.json.close()
+
+
+def load_cache(cache_file, interpreter_hash: str) -> dict:
+    """
+    Loads the cached results, the results of the other version of the interpreter are not used
+    @param cache_file: Name of the cache file or None
+    @param interpreter_hash: Hash of interpret.py
+    @return: The results by the hashes of the source and the input
+    """
+    if cache_file is None:
+        return {}
+
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(cache, dict) or cache.get('interpreter') != interpreter_hash:
+        return {}
+
+    return cache.get('results', {})
+
+
+def save_cache(cache_file, interpreter_hash: str, results: dict):
+    """
+    Saves the cached results, the file is replaced at once, so the interrupted save doesn't damage the cache
+    @param cache_file: Name of the cache file or None
+    @param interpreter_hash: Hash of interpret.py
+    @param results: The results by the hashes of the source and the input
+    """
+    if cache_file is None:
+        return
+
+    try:
+        with open(cache_file + '.tmp', 'w') as f:
+            json.dump({'interpreter': interpreter_hash, 'results': results}, f)
+        os.replace(cache_file + '.tmp', cache_file)
+    except OSError:
+        sys.stderr.write('The cache can\'t be saved: ' + cache_file + '\n')
+
+
+def main():
+    """
+    Main program function
+    """
+    directory = '.'
+    recursive = False
+    jobs = os.cpu_count() or 1
+    timeout = DEFAULT_TIMEOUT
+    cache_file = DEFAULT_CACHE_FILE
+    junit_file = None
+    json_file = None
+
+    # Cycle through arguments
+    for arg in sys.argv[1:]:
+        if arg == '--help':
+            print_help_message()
+        elif arg[0:12] == '--directory=':
+            directory = arg[12:]
+        elif arg == '--recursive':
+            recursive = True
+        elif arg[0:7] == '--jobs=':
+            jobs = interpret.parse_number(arg, 7)
+        elif arg[0:10] == '--timeout=':
+            timeout = interpret.parse_number(arg, 10)
+        elif arg[0:8] == '--cache=':
+            cache_file = arg[8:]
+        elif arg == '--no-cache':
+            cache_file = None
+        elif arg[0:8] == '--junit=':
+            junit_file = arg[8:]
+        elif arg[0:7] == '--json=':
+            json_file = arg[7:]
+        else:
+            interpret.print_error_message(
+                'Unknown parameter: ' + arg,
+                interpret.ERROR_INVALID_PARAMS_COMBINATION,
+                inspect.currentframe().f_lineno
+            )
+
+    if not os.path.isdir(directory):
+        interpret.print_error_message(
+            'Directory with tests doesn\'t exist: ' + directory,
+            interpret.ERROR_OPEN_INPUT_FILE,
+            inspect.currentframe().f_lineno
+        )
+
+    # The cached results are valid only for the same interpret.py
+    interpreter_hash = hash_bytes(read_file(interpret.__file__))
+    cached = load_cache(cache_file, interpreter_hash)
+    results = dict(cached)
+
+    reports = Reports(junit_file, json_file)
+    summary = {'tests': 0, 'passed': 0, 'failed': 0, 'cached': 0}
+
+    def finish(path, key, result):
+        # Timeouts are not cached, they could be caused by the load of the machine
+        if result['code'] is not None:
+            results[key] = result
+
+        evaluated = evaluate(path, result)
+        reports.write(evaluated)
+
+        summary['tests'] += 1
+        if evaluated['status'] == 'passed':
+            summary['passed'] += 1
+        else:
+            summary['failed'] += 1
+            print('FAILED %s (%s: expected %d, got %s)' % (
+                path, evaluated['status'], evaluated['expected_rc'], evaluated['code']
+            ))
+
+    # The tests with the cached results are not run again
+    tasks = []
+    keys = {}
+    for path in get_tests(directory, recursive):
+        source = read_file(path + '.src', b'')
+        input_data = read_file(path + '.in', b'')
+        key = hash_bytes(hash_bytes(source).encode() + hash_bytes(input_data).encode())
+
+        if key in cached:
+            summary['cached'] += 1
+            finish(path, key, dict(cached[key], time=0.0))
+        else:
+            keys[path] = key
+            tasks.append((path, source, input_data, timeout))
+
+    start = time.perf_counter()
+    if tasks:
+        with multiprocessing.Pool(min(jobs, len(tasks))) as pool:
+            for result in pool.imap_unordered(run_test, tasks, chunksize=8):
+                finish(result['path'], keys[result['path']], result)
+
+    summary['seconds'] = time.perf_counter() - start
+    reports.close(summary)
+    save_cache(cache_file, interpreter_hash, results)
+
+    print('Tests: %d, passed: %d, failed: %d, cached: %d, time: %.2f s' % (
+        summary['tests'], summary['passed'], summary['failed'], summary['cached'], summary['seconds']
+    ))
+
+    exit(0 if summary['failed'] == 0 else 1)
+
+
+# The calling of the main function, the errors end the program with their codes
+if __name__ == "__main__":
+    try:
+        main()
+    except interpret.InterpretError as error:
+        error.write(sys.stderr)
+        exit(error.code)
@@ -117,6 +117,41 @@ supplementary_tests() {
 	compare_file "${supplementary_route}/write_test.out"
 }
 
+batch_route="tests/batch"
+
+batch_tests() {
+	echo "${ORANGE}BATCH TESTS${NO_COLOR}"
+
+	# Same names of the inputs in the different directories
+	print_test_num
+	results_dir="test_batch_results"
+	rm -rf ${results_dir}
+	python3.8 interpret.py --source=${batch_route}/same_stem.src --batch="${batch_route}/same_stem/*/x.in" --batch-output=${results_dir}
+	if diff -r ${batch_route}/same_stem_results ${results_dir}; then
+		echo "${GREEN}Results are identical${NO_COLOR}"
+	else
+		echo "${RED}Results are different${NO_COLOR}"
+		exit 1
+	fi
+	rm -rf ${results_dir}
+	echo ""
+
+	# Same names of the results of the inputs with the different extensions
+	print_test_num
+	python3.8 interpret.py --source=${batch_route}/same_stem.src --batch=${batch_route}/same_name/a --batch-output=${results_dir} 2>/dev/null
+	return_code=$?
+	if [ ${return_code} -eq 12 ]; then
+		echo "${GREEN}Test successfull - return code: ${return_code}${NO_COLOR}"
+	else
+		echo "${RED}ERROR"
+		echo "Return code: ${return_code}"
+		echo "Expected: 12${NO_COLOR}"
+		exit 1
+	fi
+	rm -rf ${results_dir}
+	echo ""
+}
+
 # MAIN
 
 touch ${output_file}
@@ -125,6 +160,7 @@ header_tests
 basic_tests
 commands_tests
 supplementary_tests
+batch_tests
 
 echo "${GREEN}ALL FILES RUNNED SUCCESSFULLY${NO_COLOR}"
 